@@ -0,0 +1,4 @@
+"""Бенчмарки ValutaTrade Hub на синтетических данных.
+
+Запуск: python -m benchmarks --users 10000 --output bench.json
+"""
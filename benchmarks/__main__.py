@@ -0,0 +1,89 @@
+"""CLI бенчмарка: python -m benchmarks --help."""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.compare import compare, format_rows
+from benchmarks.datagen import generate
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Замеры операций ValutaTrade Hub на синтетических данных",
+    )
+    parser.add_argument("--users", type=int, default=10000,
+                        help="число пользователей в наборе (1k … 1M)")
+    parser.add_argument("--currencies", type=int, default=None,
+                        help="число валют из реестра (по умолчанию все)")
+    parser.add_argument("--wallets-per-user", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="вызовов на операцию")
+    parser.add_argument("--register-iterations", type=int, default=100)
+    parser.add_argument("--update-iterations", type=int, default=20)
+    parser.add_argument("--provider-latency", type=float, default=0.0,
+                        help="искусственная задержка stub-провайдера, с")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--log-format", choices=("text", "json"), default=None,
+                        help="включить журнал действий в <data-dir>/actions.log")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None,
+                        help="каталог для набора данных (по умолчанию временный)")
+    parser.add_argument("--output", default=None, help="куда записать JSON-отчёт")
+    parser.add_argument("--baseline", default=None,
+                        help="отчёт прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимый рост p50 относительно baseline (доля)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="valutatrade-bench-")
+    started = time.perf_counter()
+    dataset = generate(data_dir, args.users, args.currencies, args.wallets_per_user, args.seed)
+    dataset["generate_seconds"] = round(time.perf_counter() - started, 3)
+
+    # Настройки приложения читаются из окружения один раз, при первом
+    # обращении, поэтому runner импортируется только после подготовки каталога.
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["STORAGE_BACKEND"] = args.backend
+    if args.log_format:
+        os.environ["LOG_FILE"] = os.path.join(data_dir, "actions.log")
+        os.environ["LOG_FORMAT"] = args.log_format
+    from benchmarks.runner import run
+
+    report = run(
+        dataset,
+        iterations=args.iterations,
+        register_iterations=args.register_iterations,
+        update_iterations=args.update_iterations,
+        provider_latency=args.provider_latency,
+        seed=args.seed,
+        log_actions=bool(args.log_format),
+    )
+    report["meta"]["data_dir"] = data_dir
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            rows = compare(json.load(f), report, args.threshold)
+        print(format_rows(rows), file=sys.stderr)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Сравнение двух отчётов бенчмарка."""
+
+from typing import List
+
+COMPARED_METRICS = ("p50_us", "p99_us")
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> List[dict]:
+    """Изменения p50/p99 по операциям, общим для обоих отчётов.
+
+    regression=True, если p50 вырос больше чем на threshold (доля).
+    """
+    rows = []
+    for name, now in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+
+        row = {"operation": name}
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), now.get(metric)
+            row[metric] = {
+                "baseline": old,
+                "current": new,
+                "change": (new - old) / old if old else None,
+            }
+        change = row["p50_us"]["change"]
+        row["regression"] = change is not None and change > threshold
+        rows.append(row)
+    return rows
+
+
+def format_rows(rows: List[dict]) -> str:
+    lines = [f"{'operation':<28}{'p50 base':>12}{'p50 now':>12}{'Δ':>9}{'p99 Δ':>9}"]
+    for row in rows:
+        p50, p99 = row["p50_us"], row["p99_us"]
+        lines.append(
+            f"{row['operation']:<28}{p50['baseline']:>12.1f}{p50['current']:>12.1f}"
+            f"{_percent(p50['change']):>9}{_percent(p99['change']):>9}"
+            + ("  REGRESSION" if row["regression"] else "")
+        )
+    return "\n".join(lines)
+
+
+def _percent(change) -> str:
+    return "—" if change is None else f"{change:+.0%}"
@@ -0,0 +1,117 @@
+"""Генератор синтетических users.json, portfolios.json и rates.json."""
+
+import hashlib
+import json
+import os
+import random
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from valutatrade_hub.core.currencies import CURRENCY_REGISTRY
+from valutatrade_hub.infra.database import write_json_array
+
+BENCH_PASSWORD = "bench-password"
+
+# Порядок величин реальных курсов к USD, чтобы оценки выглядели правдоподобно.
+BASE_USD_RATES = {
+    "USD": 1.0,
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "RUB": 0.011,
+    "BTC": 59000.0,
+    "ETH": 3700.0,
+    "SOL": 145.0,
+}
+
+
+def bench_username(user_id: int) -> str:
+    return f"user{user_id:07d}"
+
+
+def pick_currencies(count: Optional[int] = None) -> List[str]:
+    """Первые count валют реестра (все, если count не задан)."""
+    codes = list(CURRENCY_REGISTRY)
+    if count is None:
+        return codes
+    if not 1 <= count <= len(codes):
+        raise ValueError(f"Число валют должно быть от 1 до {len(codes)}")
+    return codes[:count]
+
+
+def _users(count: int, rng: random.Random, registered: str) -> Iterable[dict]:
+    for user_id in range(1, count + 1):
+        salt = f"{rng.getrandbits(64):016x}"
+        yield {
+            "user_id": user_id,
+            "username": bench_username(user_id),
+            "hashed_password": hashlib.sha256((BENCH_PASSWORD + salt).encode()).hexdigest(),
+            "salt": salt,
+            "registration_date": registered,
+        }
+
+
+def _portfolios(count: int, codes: List[str], wallets_per_user: int,
+                rng: random.Random) -> Iterable[dict]:
+    per_user = min(wallets_per_user, len(codes))
+    for user_id in range(1, count + 1):
+        yield {
+            "user_id": user_id,
+            "wallets": {
+                code: {
+                    "currency_code": code,
+                    "units": round(
+                        rng.uniform(1, 10000) / BASE_USD_RATES[code]
+                        * 10 ** CURRENCY_REGISTRY[code].precision
+                    ),
+                }
+                for code in rng.sample(codes, per_user)
+            },
+            "version": 0,
+        }
+
+
+def make_rates(codes: List[str], rng: random.Random, timestamp: Optional[str] = None) -> dict:
+    """Срез курсов X_USD для всех валют, кроме USD, с отметкой времени timestamp."""
+    timestamp = timestamp or datetime.utcnow().isoformat() + "Z"
+    pairs = {
+        f"{code}_USD": {
+            "rate": BASE_USD_RATES[code] * rng.uniform(0.98, 1.02),
+            "updated_at": timestamp,
+            "source": "Benchmark",
+        }
+        for code in codes
+        if code != "USD"
+    }
+    return {"pairs": pairs, "last_refresh": timestamp}
+
+
+def generate(data_dir: str, users: int, currencies: Optional[int] = None,
+             wallets_per_user: int = 3, seed: int = 0) -> dict:
+    """Создаёт в data_dir синтетический набор данных и возвращает его параметры."""
+    if users <= 0:
+        raise ValueError("Число пользователей должно быть положительным")
+
+    codes = pick_currencies(currencies)
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    registered = datetime.utcnow().isoformat()
+    write_json_array(
+        os.path.join(data_dir, "users.json"),
+        _users(users, rng, registered),
+        index_keys=("user_id", "username"),
+    )
+    write_json_array(
+        os.path.join(data_dir, "portfolios.json"),
+        _portfolios(users, codes, wallets_per_user, rng),
+        index_keys=("user_id",),
+    )
+    with open(os.path.join(data_dir, "rates.json"), "w", encoding="utf-8") as f:
+        json.dump(make_rates(codes, rng), f, indent=2)
+
+    return {
+        "users": users,
+        "currencies": codes,
+        "wallets_per_user": min(wallets_per_user, len(codes)),
+        "seed": seed,
+    }
@@ -0,0 +1,145 @@
+"""Время запуска CLI по данным python -X importtime.
+
+Запуск: python -m benchmarks.importtime [--runs 7] [--budget-ms 80] [--baseline startup.json]
+
+Команды выполняются в режиме скрипта (main.py --script -), как при вызове
+из конвейера. Завершается с кодом 1, если при запуске импортирован модуль
+из STARTUP_FORBIDDEN, суммарное время импорта превысило --budget-ms или
+выросло относительно --baseline больше чем на --threshold.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Команды, для которых меряется холодный запуск.
+STARTUP_COMMANDS = ("help", "get-rate --from BTC --to USD")
+
+# Тяжёлые зависимости, которые должны импортироваться только командами,
+# которым они нужны (см. cli/interface.py).
+STARTUP_FORBIDDEN = ("requests", "asyncio", "prettytable", "numpy")
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """{модуль: собственное время импорта, мкс} из вывода -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # заголовок таблицы
+        modules[fields[2].strip()] = int(fields[0])
+    return modules
+
+
+def run_once(command: str, env: dict) -> dict:
+    """Один холодный запуск: стеновое время, время импорта и список модулей."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py"), "--script", "-"],
+        input=command + "\n", capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode not in (0, 1):
+        raise RuntimeError(f"'{command}' завершилась с кодом {proc.returncode}: {proc.stderr}")
+
+    modules = parse_importtime(proc.stderr)
+    return {"wall_ms": wall * 1000, "import_ms": sum(modules.values()) / 1000,
+            "modules": modules}
+
+
+def measure_startup(commands: Sequence[str] = STARTUP_COMMANDS, runs: int = 7) -> dict:
+    """Медианы стенового времени и времени импорта по runs запускам каждой команды."""
+    data_dir = tempfile.mkdtemp(prefix="valutatrade-startup-")
+    env = {
+        **os.environ,
+        "DATA_DIR": os.environ.get("DATA_DIR", os.path.join(ROOT, "data")),
+        "LOG_FILE": os.path.join(data_dir, "actions.log"),
+    }
+
+    results = {}
+    for command in commands:
+        samples = [run_once(command, env) for _ in range(runs)]
+        imported = set().union(*(s["modules"] for s in samples))
+        results[command] = {
+            "runs": runs,
+            "wall_ms": statistics.median(s["wall_ms"] for s in samples),
+            "import_ms": statistics.median(s["import_ms"] for s in samples),
+            "modules": len(imported),
+            "forbidden": sorted(name for name in STARTUP_FORBIDDEN if name in imported),
+        }
+    return results
+
+
+def check(results: dict, budget_ms: Optional[float] = None,
+          baseline: Optional[dict] = None, threshold: float = 0.2) -> List[str]:
+    """Список нарушений: запрещённые импорты, превышение бюджета и рост к baseline."""
+    problems = []
+    for command, now in results.items():
+        if now["forbidden"]:
+            problems.append(f"{command}: при запуске импортированы {', '.join(now['forbidden'])}")
+        if budget_ms is not None and now["import_ms"] > budget_ms:
+            problems.append(f"{command}: импорт {now['import_ms']:.1f} мс > {budget_ms:.1f} мс")
+
+        before = (baseline or {}).get(command)
+        if before and before["import_ms"]:
+            change = (now["import_ms"] - before["import_ms"]) / before["import_ms"]
+            if change > threshold:
+                problems.append(
+                    f"{command}: импорт {before['import_ms']:.1f} → "
+                    f"{now['import_ms']:.1f} мс ({change:+.0%})"
+                )
+    return problems
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.importtime",
+        description="Время холодного запуска CLI (python -X importtime)",
+    )
+    parser.add_argument("--runs", type=int, default=7, help="запусков на команду")
+    parser.add_argument("--command", action="append", dest="commands",
+                        help="команда CLI (можно несколько; по умолчанию help и get-rate)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="предел суммарного времени импорта, мс")
+    parser.add_argument("--output", default=None, help="куда записать JSON-отчёт")
+    parser.add_argument("--baseline", default=None,
+                        help="отчёт прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимый рост времени импорта относительно baseline (доля)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = measure_startup(args.commands or STARTUP_COMMANDS, args.runs)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    problems = check(results, args.budget_ms, baseline, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
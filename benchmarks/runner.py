@@ -0,0 +1,251 @@
+"""Замеры операций ValutaTrade Hub на подготовленном каталоге данных.
+
+Модуль импортирует valutatrade_hub, поэтому DATA_DIR и остальные
+переменные окружения должны быть выставлены до его импорта.
+"""
+
+import logging
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
+
+from benchmarks.datagen import BENCH_PASSWORD, bench_username
+from benchmarks.stubs import StubCryptoClient, StubFiatClient, StubLaggardClient
+from valutatrade_hub.cli.interface import calculate_portfolio_value
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.currencies import CURRENCY_REGISTRY
+from valutatrade_hub.core.portfolio_book import PortfolioBook
+from valutatrade_hub.core.rate_snapshot import get_rate_snapshot
+from valutatrade_hub.infra.database import (
+    DatabaseManager,
+    build_json_index,
+    find_json_record,
+    iter_json_array,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.infra.storage import JsonStorage, SqliteStorage
+from valutatrade_hub.logging_config import setup_logging, shutdown_logging
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def summarize(samples_ns: List[int]) -> dict:
+    """Сводка по замерам: число, среднее, перцентили (nearest rank), максимум, мкс."""
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+    total = sum(ordered)
+
+    summary = {"count": count, "mean_us": total / count / 1000}
+    for p in PERCENTILES:
+        rank = max(math.ceil(p / 100 * count), 1)
+        summary[f"p{p}_us"] = ordered[rank - 1] / 1000
+    summary["max_us"] = ordered[-1] / 1000
+    summary["ops_per_sec"] = count / (total / 1e9) if total else None
+    return summary
+
+
+def measure(func: Callable, calls: Iterable[tuple]) -> dict:
+    """Вызывает func(*args) для каждого набора аргументов и сводит время вызовов.
+
+    Первый вызов (прогрев кешей, загрузка файлов) учитывается отдельно
+    как first_call_us и не входит в перцентили.
+    """
+    samples = []
+    first_call = None
+    clock = time.perf_counter_ns
+
+    for args in calls:
+        started = clock()
+        func(*args)
+        elapsed = clock() - started
+        if first_call is None:
+            first_call = elapsed
+        else:
+            samples.append(elapsed)
+
+    summary = summarize(samples or [first_call])
+    summary["first_call_us"] = first_call / 1000
+    return summary
+
+
+def allocated_bytes(build: Callable) -> int:
+    """Сколько памяти остаётся занято результатом build() (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return allocated
+
+
+def measure_models(records: List[dict]) -> dict:
+    """Память и время построения портфелей: объекты Portfolio против PortfolioBook."""
+    count = len(records)
+    objects = allocated_bytes(lambda: [usecases._portfolio_from_dict(r) for r in records])
+    book = allocated_bytes(lambda: PortfolioBook.from_records(records))
+
+    started = time.perf_counter_ns()
+    for record in records:
+        usecases._portfolio_from_dict(record)
+    objects_ns = time.perf_counter_ns() - started
+
+    started = time.perf_counter_ns()
+    PortfolioBook.from_records(records)
+    book_ns = time.perf_counter_ns() - started
+
+    return {
+        "portfolios": count,
+        "portfolio_bytes": objects / count,
+        "portfolio_book_bytes": book / count,
+        "portfolio_build_us": objects_ns / count / 1000,
+        "portfolio_book_build_us": book_ns / count / 1000,
+    }
+
+
+def _scan_for(filepath: str, key: str, value) -> Optional[dict]:
+    """Потоковый просмотр без индекса до первой записи с record[key] == value."""
+    for _, _, record in iter_json_array(filepath):
+        if isinstance(record, dict) and record.get(key) == value:
+            return record
+    return None
+
+
+def measure_lookup(filepath: str, usernames: List[str], scan_iterations: int = 5) -> dict:
+    """Поиск одной записи в JSON-файле: по сайдкар-индексу и потоковым просмотром.
+
+    Индекс строится заново: после register_user файл меньше
+    JSON_STREAM_MIN_BYTES остаётся без него.
+    """
+    build_json_index(filepath, "username")
+    return {
+        "indexed": measure(
+            find_json_record, ((filepath, "username", name) for name in usernames)
+        ),
+        "streaming": measure(
+            _scan_for,
+            ((filepath, "username", name) for name in usernames[:scan_iterations + 1]),
+        ),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _prepare_backend():
+    settings = SettingsLoader()
+    if settings.storage_backend == "sqlite":
+        SqliteStorage(settings.sqlite_file).import_json(JsonStorage())
+
+
+def run(dataset: dict, iterations: int, register_iterations: int,
+        update_iterations: int, provider_latency: float = 0.0, seed: int = 0,
+        log_actions: bool = False) -> dict:
+    """Запускает все замеры и возвращает отчёт для сохранения в JSON.
+
+    log_actions включает журнал действий (LOG_FILE/LOG_FORMAT) так же, как
+    в main.py, но без вывода в консоль; без него логгер valutatrade_hub
+    на время замеров заглушён, чтобы вывод в stderr не попадал в замеры.
+    """
+    rng = random.Random(seed)
+    users = dataset["users"]
+    codes = [code for code in dataset["currencies"] if code in CURRENCY_REGISTRY]
+    traded = [code for code in codes if code != "USD"] or codes
+
+    _prepare_backend()
+    mute = logging.NullHandler()
+    if log_actions:
+        setup_logging(console=False)
+    else:
+        logging.getLogger("valutatrade_hub").addHandler(mute)
+    settings = SettingsLoader()
+    storage = DatabaseManager().storage
+    results = {}
+
+    user_ids = [rng.randint(1, users) for _ in range(iterations)]
+
+    results["login_user"] = measure(
+        usecases.login_user,
+        ((bench_username(uid), BENCH_PASSWORD) for uid in user_ids),
+    )
+    results["load_portfolio"] = measure(usecases.load_portfolio, ((uid,) for uid in user_ids))
+    results["get_rate"] = measure(
+        usecases.get_rate, ((rng.choice(traded), "USD") for _ in range(iterations))
+    )
+
+    matrix = get_rate_snapshot().matrix
+    wallets = [usecases.load_portfolio(uid).wallets for uid in user_ids[:1000]]
+    results["calculate_portfolio_value"] = measure(
+        calculate_portfolio_value,
+        ((matrix, wallets[i % len(wallets)], "USD") for i in range(iterations)),
+    )
+
+    # Два знака после запятой — в пределах точности любой валюты реестра.
+    orders = [(uid, rng.choice(traded), round(rng.uniform(0.01, 10), 2)) for uid in user_ids]
+    results["buy"] = measure(usecases.buy, orders)
+    results["sell"] = measure(usecases.sell, orders)
+
+    results["register_user"] = measure(
+        usecases.register_user,
+        ((bench_username(users + i), BENCH_PASSWORD) for i in range(1, register_iterations + 1)),
+    )
+
+    config = ParserConfig()
+    updater = RatesUpdater(
+        [
+            StubCryptoClient(config, codes, provider_latency, seed),
+            StubFiatClient(config, codes, provider_latency, seed + 1),
+            StubLaggardClient(config, codes, provider_latency, seed + 2),
+        ],
+        config,
+    )
+    results["RatesUpdater.run_update"] = measure(
+        updater.run_update, (() for _ in range(update_iterations))
+    )
+    if log_actions:
+        shutdown_logging()
+    else:
+        logging.getLogger("valutatrade_hub").removeHandler(mute)
+
+    records = list(islice(storage.iter_portfolios(), 10000))
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage_backend": settings.storage_backend,
+            "journal_enabled": settings.journal_enabled,
+            "portfolio_layout": settings.portfolio_layout,
+            "iterations": iterations,
+            "register_iterations": register_iterations,
+            "update_iterations": update_iterations,
+            "provider_latency": provider_latency,
+            "log_format": settings.log_format if log_actions else None,
+            **{f"dataset_{key}": value for key, value in dataset.items()},
+        },
+        "results": results,
+        "models": measure_models(records),
+    }
+    if settings.storage_backend == "json":
+        report["lookup"] = measure_lookup(
+            settings.users_file, [bench_username(uid) for uid in user_ids]
+        )
+    return report
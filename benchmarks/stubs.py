@@ -0,0 +1,57 @@
+"""Клиенты курсов без сети для бенчмарка RatesUpdater."""
+
+import random
+import time
+from typing import List, Set
+
+from benchmarks.datagen import BASE_USD_RATES
+from valutatrade_hub.parser_service.api_clients import BaseApiClient, FetchResult
+from valutatrade_hub.parser_service.config import ParserConfig
+
+
+class StubRatesClient(BaseApiClient):
+    """Возвращает случайно «дрожащие» курсы X_USD после искусственной задержки.
+
+    Разброс (±JITTER) много меньше порога выбросов RATES_OUTLIER_THRESHOLD,
+    чтобы замер шёл по обычному пути сведения, а не по отбрасыванию выбросов.
+    """
+
+    name = "Benchmark"
+    JITTER = 0.002
+
+    def __init__(self, config: ParserConfig, codes: List[str], latency: float = 0.0,
+                 seed: int = 0):
+        super().__init__(config)
+        self.codes = [code for code in codes if code != "USD"]
+        self.latency = latency
+        self._rng = random.Random(seed)
+
+    def supported_pairs(self) -> Set[str]:
+        return {f"{code}_USD" for code in self.codes}
+
+    def fetch_rates(self) -> FetchResult:
+        if self.latency:
+            time.sleep(self.latency)
+        low, high = 1 - self.JITTER, 1 + self.JITTER
+        return FetchResult({
+            f"{code}_USD": BASE_USD_RATES[code] * self._rng.uniform(low, high)
+            for code in self.codes
+        })
+
+
+class StubCryptoClient(StubRatesClient):
+    name = "BenchmarkCrypto"
+
+
+class StubFiatClient(StubRatesClient):
+    name = "BenchmarkFiat"
+
+
+class StubLaggardClient(StubRatesClient):
+    """Третий провайдер, отвечающий в десять раз медленнее: кворум его не ждёт."""
+
+    name = "BenchmarkLaggard"
+
+    def __init__(self, config: ParserConfig, codes: List[str], latency: float = 0.0,
+                 seed: int = 0):
+        super().__init__(config, codes, latency * 10, seed)
@@ -1,14 +1,90 @@
 """Точка входа приложения."""
 
-from valutatrade_hub.cli.interface import run_cli
+import argparse
+import sys
+
+from valutatrade_hub.cli.interface import run_cli, run_daemon, run_script
+from valutatrade_hub.cli.output import OUTPUT_FORMATS
+from valutatrade_hub.infra.settings import SettingsLoader
 from valutatrade_hub.logging_config import setup_logging
+from valutatrade_hub.metrics import PrometheusFileExporter
 
 
-def main():
+def main() -> int:
     """Главная функция запуска приложения."""
+    parser = argparse.ArgumentParser(prog="project", description="ValutaTrade Hub")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="только фоновое обновление курсов (без интерактивного CLI)",
+    )
+    parser.add_argument(
+        "--api",
+        action="store_true",
+        help="запустить HTTP/JSON API (адрес: API_HOST, API_PORT)",
+    )
+    parser.add_argument(
+        "--script",
+        metavar="PATH",
+        help="выполнить команды из файла ('-' — из stdin) и выйти",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        help="формат вывода команд: text или json (одна JSON-строка на команду)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="в режиме скрипта остановиться на первой неуспешной команде",
+    )
+    options = parser.parse_args()
+
     setup_logging()
-    run_cli()
+
+    settings = SettingsLoader()
+    exporter = None
+    if settings.metrics_file:
+        exporter = PrometheusFileExporter(
+            settings.metrics_file, settings.metrics_export_interval
+        )
+        exporter.start()
+
+    try:
+        return run(options)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+
+
+def run(options: argparse.Namespace) -> int:
+    """Запускает выбранный режим и возвращает код выхода."""
+    if options.daemon:
+        run_daemon()
+        return 0
+
+    if options.api:
+        # asyncio и слой API нужны только этому режиму.
+        from valutatrade_hub.api.server import run_api_server
+
+        run_api_server()
+        return 0
+
+    if options.script and options.script != "-":
+        try:
+            with open(options.script, "r", encoding="utf-8") as f:
+                return run_script(f, options.format, options.fail_fast)
+        except OSError as e:
+            print(f"Ошибка чтения скрипта: {e}", file=sys.stderr)
+            return 2
+
+    if options.script or not sys.stdin.isatty():
+        return run_script(sys.stdin, options.format, options.fail_fast)
+
+    run_cli(options.format)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Локальный HTTP/JSON API на asyncio."""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from valutatrade_hub.api.service import TradingService
+from valutatrade_hub.api.sessions import Session
+from valutatrade_hub.core.exceptions import (
+    ApiRequestError,
+    CurrencyNotFoundError,
+    InsufficientFundsError,
+    VersionConflictError,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.metrics import MetricsRegistry
+
+logger = logging.getLogger("valutatrade_hub")
+
+MAX_BODY_BYTES = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+LISTEN_BACKLOG = 1024
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ERROR_STATUS = (
+    (VersionConflictError, HTTPStatus.CONFLICT),
+    (ApiRequestError, HTTPStatus.SERVICE_UNAVAILABLE),
+    (CurrencyNotFoundError, HTTPStatus.BAD_REQUEST),
+    (InsufficientFundsError, HTTPStatus.BAD_REQUEST),
+    (ValueError, HTTPStatus.BAD_REQUEST),
+)
+
+
+class HttpError(Exception):
+    """Ошибка, которая возвращается клиенту с указанным статусом."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        self.status = status
+        super().__init__(message)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes
+    session: Optional[Session] = field(default=None)
+
+    def json(self) -> dict:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON") from None
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Ожидался JSON-объект")
+        return data
+
+
+def _require(data: dict, *names: str) -> tuple:
+    missing = [name for name in names if data.get(name) in (None, "")]
+    if missing:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Не указаны поля: {', '.join(missing)}")
+    return tuple(data[name] for name in names)
+
+
+def _amount(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HttpError(
+            HTTPStatus.BAD_REQUEST, "'amount' должен быть положительным числом"
+        ) from None
+
+
+class ApiServer:
+    """HTTP/1.1-сервер (keep-alive, JSON) над TradingService.
+
+    Маршруты:
+      POST /register  {"username", "password"}
+      POST /login     {"username", "password"} → {"token", ...}
+      POST /logout
+      POST /buy       {"currency", "amount"}
+      POST /sell      {"currency", "amount"}
+      GET  /rate?from=<CODE>&to=<CODE>
+      GET  /portfolio[?base=<CODE>]
+      GET  /health
+      GET  /metrics   (текстовый формат Prometheus)
+
+    Методы, кроме register/login/rate/health/metrics, требуют заголовок
+    "Authorization: Bearer <token>".
+    """
+
+    def __init__(self, service: Optional[TradingService] = None):
+        self.service = service or TradingService()
+        self.routes = {
+            ("POST", "/register"): self.handle_register,
+            ("POST", "/login"): self.handle_login,
+            ("POST", "/logout"): self.handle_logout,
+            ("POST", "/buy"): self.handle_buy,
+            ("POST", "/sell"): self.handle_sell,
+            ("GET", "/rate"): self.handle_rate,
+            ("GET", "/portfolio"): self.handle_portfolio,
+            ("GET", "/health"): self.handle_health,
+            ("GET", "/metrics"): self.handle_metrics,
+        }
+        self._authenticated = {"/logout", "/buy", "/sell", "/portfolio"}
+
+    async def handle_register(self, request: Request):
+        username, password = _require(request.json(), "username", "password")
+        return HTTPStatus.CREATED, await self.service.register(username, password)
+
+    async def handle_login(self, request: Request):
+        username, password = _require(request.json(), "username", "password")
+        try:
+            session = await self.service.login(username, password)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, str(e)) from None
+        return HTTPStatus.OK, {
+            "token": session.token,
+            "user_id": session.user_id,
+            "username": session.username,
+            "expires_in": self.service.sessions.ttl_seconds,
+        }
+
+    async def handle_logout(self, request: Request):
+        self.service.sessions.revoke(request.session.token)
+        return HTTPStatus.OK, {"logged_out": True}
+
+    async def handle_buy(self, request: Request):
+        currency, amount = _require(request.json(), "currency", "amount")
+        result = await self.service.buy(request.session.user_id, currency, _amount(amount))
+        return HTTPStatus.OK, result
+
+    async def handle_sell(self, request: Request):
+        currency, amount = _require(request.json(), "currency", "amount")
+        result = await self.service.sell(request.session.user_id, currency, _amount(amount))
+        return HTTPStatus.OK, result
+
+    async def handle_rate(self, request: Request):
+        from_code, to_code = _require(request.query, "from", "to")
+        return HTTPStatus.OK, await self.service.get_rate(from_code, to_code)
+
+    async def handle_portfolio(self, request: Request):
+        base = request.query.get("base") or SettingsLoader().default_base_currency
+        return HTTPStatus.OK, await self.service.portfolio(request.session.user_id, base)
+
+    async def handle_health(self, request: Request):
+        return HTTPStatus.OK, {"status": "ok", "sessions": len(self.service.sessions)}
+
+    async def handle_metrics(self, request: Request):
+        return HTTPStatus.OK, MetricsRegistry().to_prometheus()
+
+    def _authenticate(self, request: Request):
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        session = self.service.sessions.get(token.strip()) if scheme == "Bearer" else None
+        if session is None:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Требуется вход: POST /login")
+        request.session = session
+
+    async def dispatch(self, request: Request) -> Tuple[HTTPStatus, Union[dict, str]]:
+        """Выполняет запрос и переводит исключения в HTTP-статусы."""
+        try:
+            handler = self.routes.get((request.method, request.path))
+            if handler is None:
+                if any(path == request.path for _, path in self.routes):
+                    raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается")
+                raise HttpError(HTTPStatus.NOT_FOUND, f"Неизвестный путь {request.path}")
+            if request.path in self._authenticated:
+                self._authenticate(request)
+            return await handler(request)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            for exc_type, status in ERROR_STATUS:
+                if isinstance(e, exc_type):
+                    return status, {"error": str(e)}
+            logger.exception(f"API {request.method} {request.path} failed")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка сервера"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        """Обслуживает одно соединение; запросы keep-alive идут по очереди."""
+        try:
+            while True:
+                request, keep_alive = await self._read_request(reader)
+                if request is None:
+                    break
+                status, payload = await self.dispatch(request)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            writer.write(_response(e.status, {"error": str(e)}, False))
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[Optional[Request], bool]:
+        line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        if not line:
+            return None, False
+
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректная строка запроса") from None
+
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+
+        url = urlsplit(target)
+        request = Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+        return request, keep_alive
+
+    async def serve(self, host: str, port: int):
+        """Запускает сервер и обслуживает клиентов до отмены."""
+        server = await asyncio.start_server(
+            self.handle_connection, host, port, backlog=LISTEN_BACKLOG
+        )
+        logger.info(f"API server listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.service.close()
+
+
+def _response(status: HTTPStatus, payload: Union[dict, str], keep_alive: bool) -> bytes:
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+        content_type = PROMETHEUS_CONTENT_TYPE
+    else:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        content_type = "application/json; charset=utf-8"
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def run_api_server(host: Optional[str] = None, port: Optional[int] = None):
+    """Запускает API-сервер (блокирует до Ctrl+C)."""
+    settings = SettingsLoader()
+    host = host or settings.api_host
+    port = port or settings.api_port
+    print(f"=== ValutaTrade Hub API: http://{host}:{port} (Ctrl+C для остановки) ===")
+    try:
+        asyncio.run(ApiServer().serve(host, port))
+    except KeyboardInterrupt:
+        print("\nДо свидания!")
@@ -0,0 +1,91 @@
+"""Асинхронный фасад над бизнес-логикой для API-сервера."""
+
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from valutatrade_hub.api.sessions import Session, SessionStore
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.rate_matrix import RateMatrix
+from valutatrade_hub.core.rate_snapshot import get_rate_snapshot
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+class TradingService:
+    """Операции API поверх usecases.
+
+    Записи одного пользователя выполняются строго по очереди (asyncio.Lock
+    на user_id; замок живёт, пока его держат или ждут), разные пользователи
+    работают параллельно; блокирующая работа с хранилищем уходит в пул
+    потоков, чтобы не останавливать цикл событий. Портфель читается из
+    хранилища при каждом запросе (это один поиск записи), поэтому сделки
+    из CLI и других процессов видны сразу; в памяти держится только срез
+    курсов (get_rate_snapshot).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.sessions = SessionStore(SettingsLoader().api_session_ttl_seconds)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="api-storage")
+        self._locks: Dict[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _user_lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def register(self, username: str, password: str) -> dict:
+        return await self._run(usecases.register_user, username, password)
+
+    async def login(self, username: str, password: str) -> Session:
+        user = await self._run(usecases.login_user, username, password)
+        return self.sessions.create(user.user_id, user.username)
+
+    async def buy(self, user_id: int, currency_code: str, amount: float) -> dict:
+        return await self._trade(usecases.buy, user_id, currency_code, amount)
+
+    async def sell(self, user_id: int, currency_code: str, amount: float) -> dict:
+        return await self._trade(usecases.sell, user_id, currency_code, amount)
+
+    async def _trade(self, action, user_id: int, currency_code: str, amount: float) -> dict:
+        async with self._user_lock(user_id):
+            return await self._run(action, user_id, currency_code, amount)
+
+    async def get_rate(self, from_code: str, to_code: str) -> dict:
+        return await self._run(usecases.get_rate, from_code, to_code)
+
+    async def portfolio(self, user_id: int, base_currency: str) -> dict:
+        """Портфель пользователя с оценкой в базовой валюте."""
+        base_currency = get_currency(base_currency).code
+
+        portfolio = await self._run(usecases.load_portfolio, user_id)
+
+        matrix = self._rate_matrix()
+        wallets = []
+        total = 0.0
+        for code, wallet in portfolio.wallets.items():
+            value = wallet.balance * matrix.rate(code, base_currency)
+            total += value
+            wallets.append({"currency": code, "balance": wallet.balance, "value": value})
+
+        return {
+            "user_id": user_id,
+            "base": base_currency,
+            "wallets": wallets,
+            "total": total,
+            "rates_updated_at": matrix.last_refresh,
+        }
+
+    def _rate_matrix(self) -> RateMatrix:
+        """Матрица курсов общего среза (см. get_rate_snapshot)."""
+        return get_rate_snapshot().matrix
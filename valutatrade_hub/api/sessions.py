@@ -0,0 +1,70 @@
+"""Сессии API: выдача и проверка токенов."""
+
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class Session:
+    """Сессия пользователя, открытая через login."""
+
+    token: str
+    user_id: int
+    username: str
+    expires_at: float
+
+
+class SessionStore:
+    """Токены сессий в памяти процесса с ограниченным сроком жизни.
+
+    Просроченные сессии удаляются при обращении к ним и периодической
+    чисткой при выдаче новых токенов.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + ttl_seconds
+
+    def create(self, user_id: int, username: str) -> Session:
+        """Открывает новую сессию и возвращает её."""
+        now = time.monotonic()
+        session = Session(
+            token=secrets.token_urlsafe(32),
+            user_id=user_id,
+            username=username,
+            expires_at=now + self.ttl_seconds,
+        )
+        with self._lock:
+            self._sessions[session.token] = session
+            if now >= self._next_sweep:
+                self._sweep(now)
+        return session
+
+    def get(self, token: str) -> Optional[Session]:
+        """Действующая сессия по токену или None."""
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        if session.expires_at <= time.monotonic():
+            self.revoke(token)
+            return None
+        return session
+
+    def revoke(self, token: str):
+        """Закрывает сессию."""
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _sweep(self, now: float):
+        expired = [t for t, s in self._sessions.items() if s.expires_at <= now]
+        for token in expired:
+            del self._sessions[token]
+        self._next_sweep = now + self.ttl_seconds
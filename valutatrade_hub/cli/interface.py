@@ -1,23 +1,42 @@
-"""Командный интерфейс (CLI)."""
+"""Командный интерфейс (CLI).
 
-from prettytable import PrettyTable
+Тяжёлые зависимости (prettytable, requests через parser_service, sqlite3,
+NumPy) импортируются внутри команд при первом вызове: запуск CLI и простые
+команды вроде help или get-rate за них не платят.
+"""
 
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from valutatrade_hub.cli.output import CommandOutput
 from valutatrade_hub.core import usecases
 from valutatrade_hub.core.exceptions import (
     ApiRequestError,
     CurrencyNotFoundError,
     InsufficientFundsError,
+    VersionConflictError,
 )
-from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.core.rate_matrix import RateMatrix
+from valutatrade_hub.core.rate_snapshot import get_rate_snapshot
 from valutatrade_hub.infra.settings import SettingsLoader
-from valutatrade_hub.parser_service.api_clients import (
-    CoinGeckoClient,
-    ExchangeRateApiClient,
-)
-from valutatrade_hub.parser_service.config import ParserConfig
-from valutatrade_hub.parser_service.updater import RatesUpdater
+from valutatrade_hub.metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from valutatrade_hub.parser_service.scheduler import RatesScheduler
+    from valutatrade_hub.parser_service.updater import RatesUpdater
 
 current_user = None
+output = CommandOutput()
+
+
+def _require_login() -> bool:
+    if current_user:
+        return True
+    output.fail("Сначала выполните login")
+    return False
 
 
 def parse_args(command_line: str) -> tuple:
@@ -52,18 +71,19 @@ def cmd_register(args):
     password = args.get("password")
 
     if not username or not password:
-        print("Использование: register --username <name> --password <pass>")
+        output.fail("Использование: register --username <name> --password <pass>")
         return
 
     try:
         result = usecases.register_user(username, password)
-        print(
+        output.result(result)
+        output.say(
             f"Пользователь '{result['username']}' зарегистрирован "
             f"(id={result['user_id']}). "
             f"Войдите: login --username {username} --password ****"
         )
     except ValueError as e:
-        print(f"Ошибка: {e}")
+        output.fail(f"Ошибка: {e}")
 
 
 def cmd_login(args):
@@ -74,44 +94,29 @@ def cmd_login(args):
     password = args.get("password")
 
     if not username or not password:
-        print("Использование: login --username <name> --password <pass>")
+        output.fail("Использование: login --username <name> --password <pass>")
         return
 
     try:
         user = usecases.login_user(username, password)
         current_user = user
-        print(f"Вы вошли как '{user.username}'")
+        output.result({"user_id": user.user_id, "username": user.username})
+        output.say(f"Вы вошли как '{user.username}'")
     except ValueError as e:
-        print(f"Ошибка: {e}")
+        output.fail(f"Ошибка: {e}")
 
 
-def get_rate(pairs, from_code: str, to_code: str) -> float:
+def get_rate(matrix: RateMatrix, from_code: str, to_code: str) -> float:
     """Получает курс между валютами"""
-    if from_code == to_code:
-        return 1.0
-
-    direct = pairs.get(f"{from_code}_{to_code}")
-    if direct:
-        return direct["rate"]
-
-    reverse = pairs.get(f"{to_code}_{from_code}")
-    if reverse and reverse["rate"]:
-        return 1 / reverse["rate"]
-
-    if from_code != "USD" and to_code != "USD":
-        usd_base = get_rate(pairs, from_code, "USD")
-        usd_target = get_rate(pairs, "USD", to_code)
-        return usd_base * usd_target if usd_base and usd_target else 0.0
+    return matrix.rate(from_code, to_code)
 
-    return 0.0
 
-
-def calculate_portfolio_value(pairs, wallets_dict, base):
+def calculate_portfolio_value(matrix, wallets_dict, base):
     total = 0.0
     rows = []
     for code, wallet in wallets_dict.items():
         balance = wallet.balance
-        rate = get_rate(pairs, code, base)
+        rate = get_rate(matrix, code, base)
         value = balance * rate
         total += value
         rows.append((code, balance, value))
@@ -120,25 +125,36 @@ def calculate_portfolio_value(pairs, wallets_dict, base):
 
 def cmd_show_portfolio(args):
     """Команда show-portfolio с prettytable и конвертацией базовой валюты."""
-    if not current_user:
-        print("Сначала выполните login")
+    if not _require_login():
         return
 
+    from prettytable import PrettyTable
+
     base_currency = args.get("base", "USD").upper()
 
     try:
         portfolio = usecases.load_portfolio(current_user.user_id)
         wallets = portfolio.wallets
         if not wallets:
-            print(f"Портфель пользователя '{current_user.username}' пуст.")
+            output.result({"base": base_currency, "wallets": [], "total": 0.0})
+            output.say(f"Портфель пользователя '{current_user.username}' пуст.")
             return
 
-        settings = SettingsLoader()
-        db = DatabaseManager()
-        pairs = db.read_json(settings.rates_file).get("pairs", {})
+        matrix = get_rate_snapshot().matrix
+
+        total_value, rows = calculate_portfolio_value(matrix, wallets, base_currency)
+        output.result({
+            "base": base_currency,
+            "wallets": [
+                {"currency": code, "balance": balance, "value": value}
+                for code, balance, value in rows
+            ],
+            "total": total_value,
+        })
+        if output.is_json:
+            return
 
-        total_value, rows = calculate_portfolio_value(pairs, wallets, base_currency)
-        print(f"\nПортфель пользователя '{current_user.username}' (база: {base_currency}):\n")
+        output.say(f"\nПортфель пользователя '{current_user.username}' (база: {base_currency}):\n")
 
         table = PrettyTable()
         table.field_names = ["Валюта", "Баланс", f"Стоимость ({base_currency})"]
@@ -146,81 +162,139 @@ def cmd_show_portfolio(args):
         for code, balance, value in rows:
             table.add_row([code, f"{balance:.4f}", f"{value:.2f}"])
 
-        print(table)
-        print(f"\nИТОГО: {total_value:,.2f} {base_currency}\n")
+        output.say(table)
+        output.say(f"\nИТОГО: {total_value:,.2f} {base_currency}\n")
 
     except Exception as e:
-        print(f"Ошибка: {e}")
+        output.fail(f"Ошибка: {e}")
 
 
 def cmd_buy(args):
     """Команда buy."""
-    if not current_user:
-        print("Сначала выполните login")
+    if not _require_login():
         return
 
     currency = args.get("currency")
     amount = args.get("amount")
 
     if not currency or not amount:
-        print("Использование: buy --currency <CODE> --amount <float>")
+        output.fail("Использование: buy --currency <CODE> --amount <float>")
         return
 
     try:
         amount = float(amount)
         result = usecases.buy(current_user.user_id, currency, amount)
+        output.result(result)
 
-        print(
+        output.say(
             f"Покупка выполнена: {result['amount']:.4f} {result['currency']} "
             f"по курсу {result['rate']:.2f} USD/{result['currency']}"
         )
-        print("Изменения в портфеле:")
-        print(
+        output.say("Изменения в портфеле:")
+        output.say(
             f"- {result['currency']}: было {result['old_balance']:.4f} "
             f"→ стало {result['new_balance']:.4f}"
         )
         if result.get("estimated_cost"):
-            print(
+            output.say(
                 f"Оценочная стоимость покупки: {result['estimated_cost']:.2f} USD"
             )
 
-    except (ValueError, CurrencyNotFoundError) as e:
-        print(f"Ошибка: {e}")
+    except (ValueError, CurrencyNotFoundError, VersionConflictError) as e:
+        output.fail(f"Ошибка: {e}")
 
 
 def cmd_sell(args):
     """Команда sell."""
-    if not current_user:
-        print("Сначала выполните login")
+    if not _require_login():
         return
 
     currency = args.get("currency")
     amount = args.get("amount")
 
     if not currency or not amount:
-        print("Использование: sell --currency <CODE> --amount <float>")
+        output.fail("Использование: sell --currency <CODE> --amount <float>")
         return
 
     try:
         amount = float(amount)
         result = usecases.sell(current_user.user_id, currency, amount)
+        output.result(result)
 
-        print(
+        output.say(
             f"Продажа выполнена: {result['amount']:.4f} {result['currency']} "
             f"по курсу {result['rate']:.2f} USD/{result['currency']}"
         )
-        print("Изменения в портфеле:")
-        print(
+        output.say("Изменения в портфеле:")
+        output.say(
             f"- {result['currency']}: было {result['old_balance']:.4f} "
             f"→ стало {result['new_balance']:.4f}"
         )
         if result.get("estimated_revenue"):
-            print(
+            output.say(
                 f"Оценочная выручка: {result['estimated_revenue']:.2f} USD"
             )
 
-    except (ValueError, CurrencyNotFoundError, InsufficientFundsError) as e:
-        print(f"Ошибка: {e}")
+    except (
+        ValueError, CurrencyNotFoundError, InsufficientFundsError, VersionConflictError
+    ) as e:
+        output.fail(f"Ошибка: {e}")
+
+
+def cmd_batch(args):
+    """Команда batch: пакет заявок buy/sell из JSON-файла."""
+    if not _require_login():
+        return
+
+    filepath = args.get("file")
+    mode = args.get("mode", "atomic")
+
+    if not filepath or filepath is True:
+        output.fail("Использование: batch --file <orders.json> [--mode atomic|best-effort]")
+        return
+
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            orders = json.load(f)
+        if isinstance(orders, dict):
+            orders = orders.get("orders", [])
+        if not isinstance(orders, list):
+            output.fail(
+                "Ошибка: файл заявок должен содержать JSON-массив заявок "
+                "или объект {\"orders\": [...]}"
+            )
+            return
+
+        results = usecases.execute_batch(current_user.user_id, orders, mode)
+
+        failed = 0
+        for index, (order, result) in enumerate(zip(orders, results), start=1):
+            if "error" in result:
+                failed += 1
+                action = order.get("action") if isinstance(order, dict) else None
+                output.say(
+                    f"#{index} {action} {result['currency']}: ошибка — {result['error']}"
+                )
+            else:
+                output.say(
+                    f"#{index} {order.get('action')} {result['amount']:.4f} "
+                    f"{result['currency']}: было {result['old_balance']:.4f} "
+                    f"→ стало {result['new_balance']:.4f}"
+                )
+        output.result({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+        })
+        output.say(f"Пакет выполнен: успешно {len(results) - failed}, с ошибками {failed}")
+
+    except (OSError, json.JSONDecodeError) as e:
+        output.fail(f"Ошибка чтения файла заявок: {e}")
+    except (
+        ValueError, CurrencyNotFoundError, InsufficientFundsError, VersionConflictError
+    ) as e:
+        output.fail(f"Ошибка: {e}")
+        output.say("Пакет не исполнен, портфель не изменён.")
 
 
 def cmd_get_rate(args):
@@ -229,101 +303,469 @@ def cmd_get_rate(args):
     to_code = args.get("to")
 
     if not from_code or not to_code:
-        print("Использование: get-rate --from <CODE> --to <CODE>")
+        output.fail("Использование: get-rate --from <CODE> --to <CODE>")
         return
 
     try:
         result = usecases.get_rate(from_code, to_code)
-        print(
+        output.result(result)
+        output.say(
             f"Курс {result['from']}→{result['to']}: {result['rate']:.8f} "
             f"(обновлено: {result['updated_at']})"
         )
         if result['rate']:
             reverse = 1 / result['rate']
-            print(f"Обратный курс {result['to']}→{result['from']}: {reverse:.8f}")
+            output.say(f"Обратный курс {result['to']}→{result['from']}: {reverse:.8f}")
 
     except (CurrencyNotFoundError, ApiRequestError) as e:
-        print(f"Ошибка: {e}")
+        output.fail(f"Ошибка: {e}")
+
+
+_rates_updater = None
+
+
+def _get_rates_updater() -> "RatesUpdater":
+    """Один RatesUpdater на процесс: клиенты переиспользуют HTTP-сессии и ETag."""
+    global _rates_updater
+    if _rates_updater is None:
+        from valutatrade_hub.parser_service.api_clients import (
+            CoinGeckoClient,
+            ExchangeRateApiClient,
+            FileRatesClient,
+            KrakenClient,
+        )
+        from valutatrade_hub.parser_service.config import ParserConfig
+        from valutatrade_hub.parser_service.updater import RatesUpdater
+
+        config = ParserConfig()
+        clients = [CoinGeckoClient(config), KrakenClient(config), ExchangeRateApiClient(config)]
+        if config.LOCAL_RATES_FILE:
+            clients.append(FileRatesClient(config))
+        _rates_updater = RatesUpdater(clients, config)
+    return _rates_updater
+
+
+_rates_scheduler = None
+
+
+def _get_rates_scheduler() -> "RatesScheduler":
+    global _rates_scheduler
+    if _rates_scheduler is None:
+        from valutatrade_hub.parser_service.scheduler import RatesScheduler
+
+        _rates_scheduler = RatesScheduler(
+            _get_rates_updater(), SettingsLoader().rates_ttl_seconds
+        )
+    return _rates_scheduler
+
+
+def _print_scheduler_status(scheduler: "RatesScheduler"):
+    state = "работает" if scheduler.is_running else "остановлено"
+    health = "OK" if scheduler.is_healthy() else "есть ошибки"
+    output.say(f"Фоновое обновление курсов: {state} ({health})")
+    for job in scheduler.status():
+        line = (
+            f"  - {job['provider']}: каждые {job['interval']:.0f}s, "
+            f"следующий запуск через {job['next_run_in']:.0f}s, "
+            f"последний успех: {job['last_success'] or '—'}"
+        )
+        if job["last_status"]:
+            line += f", последний опрос: {job['last_status']}"
+        if job["failures"]:
+            line += f", ошибок подряд: {job['failures']} ({job['last_error']})"
+        output.say(line)
+
+
+def cmd_serve_rates(args):
+    """Команда serve-rates: фоновое обновление курсов до истечения TTL."""
+    scheduler = _get_rates_scheduler()
+
+    if args.get("stop"):
+        scheduler.stop(timeout=1.0)
+        output.say("Фоновое обновление курсов остановлено.")
+    elif args.get("status"):
+        _print_scheduler_status(scheduler)
+    elif scheduler.is_running:
+        output.say("Фоновое обновление курсов уже запущено.")
+    else:
+        scheduler.start()
+        output.say(
+            "Фоновое обновление курсов запущено. "
+            "Статус: serve-rates --status, остановка: serve-rates --stop"
+        )
+
+    output.result({
+        "running": scheduler.is_running,
+        "healthy": scheduler.is_healthy(),
+        "providers": scheduler.status(),
+    })
+
+
+def run_daemon():
+    """Режим демона: только обновление курсов, без интерактивного CLI."""
+    scheduler = _get_rates_scheduler()
+    print("=== ValutaTrade Hub: rates daemon (Ctrl+C для остановки) ===")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("\nДо свидания!")
+
+
+def _print_providers(result: dict):
+    timings = ", ".join(
+        f"{name} {sec:.2f}s" + ("" if status in ("ok", "not_modified") else f" ({status})")
+        for name, status in result["providers"].items()
+        if (sec := result["timings"].get(name)) is not None
+    )
+    output.say(f"Providers: {timings}")
+
+    skipped = [name for name, status in result["providers"].items() if status == "skipped"]
+    if skipped:
+        output.say(f"Fallback providers not needed: {', '.join(skipped)}")
+    for pair, providers in result["outliers"].items():
+        output.say(f"Outliers dropped for {pair}: {', '.join(providers)}")
 
 
 def cmd_update_rates(args):
     """Команда update-rates."""
     try:
-        config = ParserConfig()
-        clients = [CoinGeckoClient(config), ExchangeRateApiClient(config)]
-        updater = RatesUpdater(clients, config)
-
-        result = updater.run_update()
+        result = _get_rates_updater().run_update()
+        output.result(result)
 
-        print(
-            f"Update successful. Total rates updated: {result['total_rates']}. "
-            f"Last refresh: {result['last_refresh']}"
+        if result["not_modified"]:
+            output.say(
+                "No rate changed since the last update, rates file not rewritten. "
+                f"Last refresh: {result['last_refresh']}"
+            )
+        else:
+            output.say(
+                f"Update successful. Total rates updated: {result['total_rates']}. "
+                f"Last refresh: {result['last_refresh']}"
+            )
+        delta = result["delta"]
+        output.say(
+            f"Pairs: added {len(delta['added'])}, changed {len(delta['changed'])}, "
+            f"unchanged {len(delta['unchanged'])}, stale {len(delta['stale'])}"
         )
+        if delta["stale"]:
+            output.say(f"Stale pairs kept from earlier updates: {', '.join(delta['stale'])}")
+        _print_providers(result)
 
         if result["errors"]:
-            print("Update completed with errors:")
+            output.say("Update completed with errors:")
             for err in result["errors"]:
-                print(f"  - {err}")
+                output.say(f"  - {err}")
 
     except ApiRequestError as e:
-        print(f"Ошибка обновления: {e}")
+        output.fail(f"Ошибка обновления: {e}")
+
+
+def _parse_time(value: str) -> float:
+    """ISO-время (UTC, если зона не указана) → epoch-секунды."""
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def cmd_get_history(args):
+    """Команда get-history: свечи OHLC по сохранённой истории курсов."""
+    pair = args.get("pair")
+    interval = args.get("interval", "1h")
+
+    if not pair or pair is True:
+        output.fail(
+            "Использование: get-history --pair <FROM_TO> [--interval 1h] "
+            "[--from <ISO>] [--to <ISO>]"
+        )
+        return
+
+    from prettytable import PrettyTable
+
+    from valutatrade_hub.parser_service.config import ParserConfig
+    from valutatrade_hub.parser_service.storage import CandleStore, parse_interval
+
+    try:
+        seconds = parse_interval(interval)
+        end = _parse_time(args["to"]) if "to" in args else time.time()
+        start = _parse_time(args["from"]) if "from" in args else end - 24 * seconds
+
+        config = ParserConfig()
+        candles = CandleStore(config.CANDLES_DIR).query(pair.upper(), seconds, start, end)
+        output.result({"pair": pair.upper(), "interval": interval, "candles": candles})
+        if not candles:
+            output.say(f"Нет истории для {pair.upper()} в указанном диапазоне.")
+            return
+
+        table = PrettyTable()
+        table.field_names = ["Время (UTC)", "Open", "High", "Low", "Close", "Точек"]
+        for c in candles:
+            moment = datetime.fromtimestamp(c["start"], tz=timezone.utc)
+            table.add_row([
+                moment.strftime("%Y-%m-%d %H:%M"),
+                f"{c['open']:.6f}",
+                f"{c['high']:.6f}",
+                f"{c['low']:.6f}",
+                f"{c['close']:.6f}",
+                c["count"],
+            ])
+        output.say(f"\n{pair.upper()}, интервал {interval}:\n")
+        output.say(table)
+
+    except ValueError as e:
+        output.fail(f"Ошибка: {e}")
+
+
+def cmd_revalue_all(args):
+    """Команда revalue-all: переоценка всех портфелей в файл CSV/JSON."""
+    bases = args.get("base")
+    fmt = args.get("format", "csv")
+
+    if not bases or bases is True:
+        output.fail(
+            "Использование: revalue-all --base <CODE[,CODE...]> "
+            "[--output <path>] [--format csv|json] [--chunk-size <int>]"
+        )
+        return
+
+    output_path = args.get("output") or os.path.join(
+        SettingsLoader().data_dir, f"revaluation.{fmt}"
+    )
+
+    from valutatrade_hub.core.valuation import revalue_all
+
+    try:
+        result = revalue_all(
+            [code.strip() for code in bases.split(",") if code.strip()],
+            output_path,
+            fmt=fmt,
+            chunk_size=int(args.get("chunk-size", 10000)),
+        )
+        output.result(result)
+        totals = ", ".join(f"{v:,.2f} {code}" for code, v in result["totals"].items())
+        output.say(
+            f"Переоценено портфелей: {result['users']} "
+            f"(кошельков: {result['wallets']}) по курсам от {result['last_refresh']}"
+        )
+        output.say(f"Итого по всем портфелям: {totals}")
+        for base, codes in result["unpriced"].items():
+            output.say(f"Нет курса к {base}, не учтены в итогах: {', '.join(codes)}")
+        output.say(f"Результат записан в {result['output']}")
+
+    except (ValueError, CurrencyNotFoundError, RuntimeError, OSError) as e:
+        output.fail(f"Ошибка: {e}")
+
+
+def cmd_migrate_storage(args):
+    """Команда migrate-storage: однократный перенос data/*.json в SQLite."""
+    import sqlite3
+
+    from valutatrade_hub.infra.storage import JsonStorage, SqliteStorage
+
+    db_path = args.get("db") or SettingsLoader().sqlite_file
+
+    try:
+        counts = SqliteStorage(db_path).import_json(JsonStorage())
+        output.result({"db": db_path, **counts})
+        output.say(
+            f"Миграция в {db_path} завершена: пользователей {counts['users']}, "
+            f"портфелей {counts['portfolios']}, курсов {counts['pairs']}. "
+            "Включите бэкенд: STORAGE_BACKEND=sqlite"
+        )
+    except (OSError, ValueError, sqlite3.Error) as e:
+        output.fail(f"Ошибка миграции: {e}")
+
+
+def cmd_migrate_balances(args):
+    """Команда migrate-balances: перевод float-балансов в целые минимальные единицы."""
+    import sqlite3
+
+    dry_run = bool(args.get("dry-run"))
+
+    try:
+        stats = usecases.migrate_balances(dry_run=dry_run)
+    except (OSError, ValueError, VersionConflictError, sqlite3.Error) as e:
+        output.fail(f"Ошибка миграции: {e}")
+        return
+
+    output.result({"dry_run": dry_run, **stats})
+    if dry_run:
+        output.say(
+            f"Проверено портфелей: {stats['portfolios']}, кошельков: {stats['wallets']}. "
+            f"Старый формат у {stats['legacy_wallets']} кошельков, все переводятся без потерь."
+        )
+    else:
+        output.say(
+            f"Переведено портфелей: {stats['migrated']} "
+            f"(кошельков в старом формате: {stats['legacy_wallets']})."
+        )
+
+
+def cmd_metrics(args):
+    """Команда metrics: задержки и ошибки операций в этом процессе."""
+    registry = MetricsRegistry()
+
+    if args.get("reset"):
+        registry.reset()
+        output.say("Метрики сброшены.")
+        return
+
+    path = args.get("prometheus")
+    if path:
+        if path is True:
+            output.fail("Использование: metrics [--prometheus <path>] [--reset]")
+            return
+        try:
+            registry.write_prometheus(path)
+        except OSError as e:
+            output.fail(f"Ошибка записи метрик: {e}")
+            return
+        output.result({"prometheus": path})
+        output.say(f"Метрики в формате Prometheus записаны в {path}")
+        return
+
+    snapshot = registry.snapshot()
+    output.result(snapshot)
+    if not registry.enabled:
+        output.say("Сбор метрик отключён (METRICS_ENABLED=0).")
+        return
+    if not snapshot:
+        output.say("Операций ещё не было.")
+        return
+
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = ["Операция", "Вызовов", "Ошибок", "p50, мс", "p90, мс", "p99, мс",
+                         "max, мс"]
+    for action, m in snapshot.items():
+        table.add_row([
+            action, m["count"], m["count"] - m["ok"],
+            f"{m['p50_ms']:.3f}", f"{m['p90_ms']:.3f}", f"{m['p99_ms']:.3f}",
+            f"{m['max_ms']:.3f}",
+        ])
+    output.say(table)
+    for action, m in snapshot.items():
+        for error, n in m["errors"].items():
+            output.say(f"  {action}: {error} × {n}")
 
 
 def cmd_help(args):
     """Команда help."""
-    print("""
+    output.result({"commands": [*COMMANDS, "exit"]})
+    output.say("""
 Доступные команды:
   register --username <name> --password <pass>   Регистрация
   login --username <name> --password <pass>      Вход
   show-portfolio [--base <CURRENCY>]             Показать портфель
   buy --currency <CODE> --amount <float>         Купить валюту
   sell --currency <CODE> --amount <float>        Продать валюту
+  batch --file <orders.json> [--mode <MODE>]      Пакет заявок (atomic|best-effort)
   get-rate --from <CODE> --to <CODE>             Показать курс
   update-rates                                    Обновить курсы
+  get-history --pair <FROM_TO> [--interval 1h] [--from <ISO>] [--to <ISO>]
+                                                  История курса (OHLC)
+  serve-rates [--status | --stop]                 Фоновое обновление курсов
+  revalue-all --base <CODE[,CODE]> [--format csv|json] [--output <path>]
+                                                  Переоценка всех портфелей
+  migrate-storage [--db <path>]                   Перенести JSON-данные в SQLite
+  migrate-balances [--dry-run]                    Балансы в целых минимальных единицах
+  metrics [--prometheus <path>] [--reset]         Задержки и ошибки операций
   help                                            Справка
   exit                                            Выход
 """)
 
 
-def run_cli():
+COMMANDS = {
+    "help": cmd_help,
+    "register": cmd_register,
+    "login": cmd_login,
+    "show-portfolio": cmd_show_portfolio,
+    "buy": cmd_buy,
+    "sell": cmd_sell,
+    "batch": cmd_batch,
+    "get-rate": cmd_get_rate,
+    "update-rates": cmd_update_rates,
+    "get-history": cmd_get_history,
+    "serve-rates": cmd_serve_rates,
+    "revalue-all": cmd_revalue_all,
+    "migrate-storage": cmd_migrate_storage,
+    "migrate-balances": cmd_migrate_balances,
+    "metrics": cmd_metrics,
+}
+
+
+def execute(line: str) -> Optional[bool]:
+    """Выполняет одну строку-команду.
+
+    Возвращает True/False — успешна ли команда, или None для пустой
+    строки и комментария (#).
+    """
+    command, args = parse_args(line)
+    if not command or command.startswith("#"):
+        return None
+
+    output.begin(command)
+    cmd_func = COMMANDS.get(command)
+    try:
+        if cmd_func:
+            cmd_func(args)
+        else:
+            output.fail(f"Неизвестная команда: {command}")
+    except Exception as e:
+        output.fail(f"Непредвиденная ошибка: {e}")
+    return output.finish()
+
+
+def _set_output_format(fmt: str):
+    global output
+    output = CommandOutput(fmt)
+
+
+def _stop_scheduler():
+    if _rates_scheduler is not None:
+        _rates_scheduler.stop(timeout=1.0)
+
+
+def run_cli(fmt: str = "text"):
     """Основной цикл CLI."""
-    print("=== ValutaTrade Hub ===")
-    print("Введите 'help' для справки\n")
-
-    commands = {
-        "help": cmd_help,
-        "register": cmd_register,
-        "login": cmd_login,
-        "show-portfolio": cmd_show_portfolio,
-        "buy": cmd_buy,
-        "sell": cmd_sell,
-        "get-rate": cmd_get_rate,
-        "update-rates": cmd_update_rates,
-        "exit": None,
-    }
+    _set_output_format(fmt)
+    output.say("=== ValutaTrade Hub ===")
+    output.say("Введите 'help' для справки\n")
 
     while True:
         try:
             line = input("> ").strip()
-            if not line:
-                continue
+            if line == "exit":
+                output.say("До свидания!")
+                break
+            execute(line)
+        except (KeyboardInterrupt, EOFError):
+            output.say("\nДо свидания!")
+            break
 
-            command, args = parse_args(line)
-            if not command:
-                continue
+    _stop_scheduler()
 
-            if command == "exit":
-                print("До свидания!")
-                break
 
-            cmd_func = commands.get(command)
-            if cmd_func:
-                cmd_func(args)
-            else:
-                print(f"Неизвестная команда: {command}")
+def run_script(lines: Iterable[str], fmt: str = "text", fail_fast: bool = False) -> int:
+    """Выполняет команды из файла или канала в одном процессе.
 
-        except KeyboardInterrupt:
-            print("\nДо свидания!")
-            break
-        except Exception as e:
-            print(f"Непредвиденная ошибка: {e}")
+    Сессия (login), настройки и кеши общие для всех команд. Возвращает
+    код выхода: 0, если все команды успешны, иначе 1.
+    """
+    _set_output_format(fmt)
+    failed = 0
+
+    try:
+        for line in lines:
+            line = line.strip()
+            if line == "exit":
+                break
+            if execute(line) is False:
+                failed += 1
+                if fail_fast:
+                    break
+    finally:
+        _stop_scheduler()
+
+    return 1 if failed else 0
@@ -0,0 +1,61 @@
+"""Вывод команд CLI: текст для человека или JSON для автоматизации."""
+
+import json
+import sys
+from typing import Any, Optional
+
+OUTPUT_FORMATS = ("text", "json")
+
+
+class CommandOutput:
+    """Собирает результат одной команды и выводит его в выбранном формате.
+
+    В формате "text" строки печатаются сразу, как раньше делал print.
+    В формате "json" текст подавляется, а по завершении команды печатается
+    одна строка {"command", "ok", "data" | "error"} (JSON Lines).
+    """
+
+    def __init__(self, fmt: str = "text"):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Неизвестный формат вывода '{fmt}'. Доступны: {', '.join(OUTPUT_FORMATS)}"
+            )
+        self.fmt = fmt
+        self.begin(None)
+
+    @property
+    def is_json(self) -> bool:
+        return self.fmt == "json"
+
+    def begin(self, command: Optional[str]):
+        """Начинает вывод новой команды."""
+        self.command = command
+        self.ok = True
+        self.data: Any = None
+        self.error: Optional[str] = None
+
+    def say(self, *values, **kwargs):
+        """Человекочитаемый вывод (аналог print)."""
+        if not self.is_json:
+            print(*values, **kwargs)
+
+    def result(self, data: Any):
+        """Машиночитаемый результат команды."""
+        self.data = data
+
+    def fail(self, message: str):
+        """Отмечает команду как неуспешную."""
+        self.ok = False
+        self.error = message
+        self.say(message)
+
+    def finish(self) -> bool:
+        """Завершает команду; возвращает True, если она успешна."""
+        if self.is_json:
+            record = {"command": self.command, "ok": self.ok}
+            if self.ok:
+                record["data"] = self.data
+            else:
+                record["error"] = self.error
+            sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return self.ok
@@ -1,12 +1,21 @@
 """Иерархия классов валют с поддержкой фиатных и криптовалют."""
 
+import math
 from abc import ABC, abstractmethod
+from decimal import ROUND_HALF_EVEN, Decimal
+
+# Точность (знаков после запятой) для кодов, которых нет в реестре.
+DEFAULT_PRECISION = 8
+
+# До этого порога float представляет любое целое точно, и быстрая
+# проверка округления в to_minor_units корректна.
+_EXACT_FLOAT_INT = 2 ** 53
 
 
 class Currency(ABC):
     """Абстрактный базовый класс для валют."""
 
-    def __init__(self, name: str, code: str):
+    def __init__(self, name: str, code: str, precision: int = DEFAULT_PRECISION):
         if not code or not code.isupper() or not (2 <= len(code) <= 5):
             raise ValueError(
                 "Код валюты должен быть в верхнем регистре, 2-5 символов"
@@ -14,8 +23,12 @@ class Currency(ABC):
         if not name:
             raise ValueError("Имя валюты не может быть пустым")
 
+        if not 0 <= precision <= 18:
+            raise ValueError("Точность валюты должна быть от 0 до 18 знаков")
+
         self.name = name
         self.code = code
+        self.precision = precision
 
     @abstractmethod
     def get_display_info(self) -> str:
@@ -26,8 +39,8 @@ class Currency(ABC):
 class FiatCurrency(Currency):
     """Фиатная валюта."""
 
-    def __init__(self, name: str, code: str, issuing_country: str):
-        super().__init__(name, code)
+    def __init__(self, name: str, code: str, issuing_country: str, precision: int = 2):
+        super().__init__(name, code, precision)
         self.issuing_country = issuing_country
 
     def get_display_info(self) -> str:
@@ -38,9 +51,10 @@ class CryptoCurrency(Currency):
     """Криптовалюта."""
 
     def __init__(
-        self, name: str, code: str, algorithm: str, market_cap: float = 0.0
+        self, name: str, code: str, algorithm: str, market_cap: float = 0.0,
+        precision: int = DEFAULT_PRECISION,
     ):
-        super().__init__(name, code)
+        super().__init__(name, code, precision)
         self.algorithm = algorithm
         self.market_cap = market_cap
 
@@ -56,9 +70,10 @@ CURRENCY_REGISTRY = {
     "EUR": FiatCurrency("Euro", "EUR", "Eurozone"),
     "GBP": FiatCurrency("British Pound", "GBP", "United Kingdom"),
     "RUB": FiatCurrency("Russian Ruble", "RUB", "Russia"),
-    "BTC": CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1.12e12),
-    "ETH": CryptoCurrency("Ethereum", "ETH", "Ethash", 4.5e11),
-    "SOL": CryptoCurrency("Solana", "SOL", "Proof of History", 3.2e10),
+    "BTC": CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1.12e12, precision=8),
+    # 9 знаков (gwei), а не 18 (wei): балансы должны помещаться в int64.
+    "ETH": CryptoCurrency("Ethereum", "ETH", "Ethash", 4.5e11, precision=9),
+    "SOL": CryptoCurrency("Solana", "SOL", "Proof of History", 3.2e10, precision=9),
 }
 
 
@@ -70,3 +85,55 @@ def get_currency(code: str) -> Currency:
     if code not in CURRENCY_REGISTRY:
         raise CurrencyNotFoundError(code)
     return CURRENCY_REGISTRY[code]
+
+
+def currency_precision(code: str) -> int:
+    """Число знаков после запятой для валюты (DEFAULT_PRECISION вне реестра)."""
+    currency = CURRENCY_REGISTRY.get(code.upper())
+    return currency.precision if currency else DEFAULT_PRECISION
+
+
+def to_minor_units(amount, precision: int, exact: bool = True) -> int:
+    """Переводит сумму в целое число минимальных единиц (10 ** -precision).
+
+    При exact=True сумма, заданная точнее минимальной единицы, вызывает
+    ValueError; при exact=False она округляется (банковское округление) —
+    так читаются старые балансы с накопленной погрешностью float.
+    """
+    if isinstance(amount, int):
+        return amount * 10 ** precision
+    if isinstance(amount, float):
+        if not math.isfinite(amount):
+            raise ValueError("Сумма должна быть конечным числом")
+        # Быстрый путь: float совпадает с ближайшим к units / scale числом.
+        scale = 10 ** precision
+        units = round(amount * scale)
+        if abs(units) < _EXACT_FLOAT_INT and units / scale == amount:
+            return units
+        amount = repr(amount)
+
+    scaled = Decimal(amount).scaleb(precision)
+    units = scaled.to_integral_value(rounding=ROUND_HALF_EVEN)
+    if exact and units != scaled:
+        raise ValueError(
+            f"Сумма {amount} задана точнее допустимого (знаков после запятой: {precision})"
+        )
+    return int(units)
+
+
+def from_minor_units(units: int, precision: int) -> float:
+    """Сумма в минимальных единицах как float (ближайший к точному значению)."""
+    return units / 10 ** precision
+
+
+def wallet_units(w_data: dict) -> int:
+    """Баланс записи кошелька в минимальных единицах.
+
+    Новые записи хранят целое "units"; старые — float "balance", который
+    округляется до точности валюты.
+    """
+    units = w_data.get("units")
+    if units is not None:
+        return units
+    precision = currency_precision(w_data["currency_code"])
+    return to_minor_units(w_data.get("balance", 0), precision, exact=False)
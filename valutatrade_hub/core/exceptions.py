@@ -28,3 +28,15 @@ class ApiRequestError(Exception):
     def __init__(self, reason: str):
         self.reason = reason
         super().__init__(f"Ошибка при обращении к внешнему API: {reason}")
+
+
+class VersionConflictError(Exception):
+    """Исключение при конкурентном изменении записи (оптимистическая блокировка)."""
+
+    def __init__(self, expected: int, actual: int):
+        self.expected = expected
+        self.actual = actual
+        super().__init__(
+            f"Запись была изменена параллельно: ожидалась версия {expected}, "
+            f"текущая {actual}"
+        )
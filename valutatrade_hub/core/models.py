@@ -3,12 +3,21 @@
 import hashlib
 import secrets
 from datetime import datetime
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from valutatrade_hub.core.currencies import (
+    currency_precision,
+    from_minor_units,
+    to_minor_units,
+)
 
 
 class User:
     """Класс пользователя системы."""
 
+    __slots__ = ("_user_id", "_username", "_hashed_password", "_salt", "_registration_date")
+
     def __init__(
         self,
         user_id: int,
@@ -100,15 +109,35 @@ class User:
 
 
 class Wallet:
-    """Кошелёк для одной валюты."""
+    """Кошелёк для одной валюты.
+
+    Баланс хранится целым числом минимальных единиц валюты (точность из
+    CURRENCY_REGISTRY), поэтому deposit/withdraw не накапливают погрешность.
+    Свойство balance отдаёт его как float для отображения и оценки.
+    """
 
-    def __init__(self, currency_code: str, balance: float = 0.0):
+    __slots__ = ("currency_code", "_units", "_precision")
+
+    def __init__(self, currency_code: str, balance: float = 0.0,
+                 units: Optional[int] = None):
         self.currency_code = currency_code.upper()
-        self._balance = balance
+        self._precision = currency_precision(self.currency_code)
+        if units is None:
+            units = to_minor_units(balance, self._precision, exact=False)
+        self._units = units
+
+    @property
+    def units(self) -> int:
+        """Баланс в минимальных единицах валюты."""
+        return self._units
+
+    @property
+    def precision(self) -> int:
+        return self._precision
 
     @property
     def balance(self) -> float:
-        return self._balance
+        return from_minor_units(self._units, self._precision)
 
     @balance.setter
     def balance(self, value: float):
@@ -116,13 +145,13 @@ class Wallet:
             raise TypeError("Баланс должен быть числом")
         if value < 0:
             raise ValueError("Баланс не может быть отрицательным")
-        self._balance = value
+        self._units = to_minor_units(value, self._precision)
 
     def deposit(self, amount: float):
         """Пополнение баланса."""
         if amount <= 0:
             raise ValueError("Сумма пополнения должна быть положительной")
-        self._balance += amount
+        self._units += to_minor_units(amount, self._precision)
 
     def withdraw(self, amount: float):
         """Снятие средств."""
@@ -131,35 +160,57 @@ class Wallet:
 
         from valutatrade_hub.core.exceptions import InsufficientFundsError
 
-        if amount > self._balance:
-            raise InsufficientFundsError(self._balance, amount, self.currency_code)
+        units = to_minor_units(amount, self._precision)
+        if units > self._units:
+            raise InsufficientFundsError(self.balance, amount, self.currency_code)
 
-        self._balance -= amount
+        self._units -= units
 
     def get_balance_info(self) -> str:
         """Информация о балансе."""
-        return f"{self.currency_code}: {self._balance:.4f}"
+        return f"{self.currency_code}: {self.balance:.4f}"
 
     def to_dict(self) -> dict:
         """Сериализация в словарь."""
-        return {"currency_code": self.currency_code, "balance": self._balance}
+        return {"currency_code": self.currency_code, "units": self._units}
 
 
 class Portfolio:
     """Портфель пользователя."""
 
-    def __init__(self, user_id: int, wallets: Optional[Dict[str, Wallet]] = None):
+    __slots__ = ("_user_id", "_wallets", "_version")
+
+    def __init__(
+        self,
+        user_id: int,
+        wallets: Optional[Dict[str, Wallet]] = None,
+        version: int = 0,
+    ):
         self._user_id = user_id
         self._wallets: Dict[str, Wallet] = wallets or {}
+        self._version = version
 
     @property
     def user_id(self) -> int:
         return self._user_id
 
     @property
-    def wallets(self) -> Dict[str, Wallet]:
-        """Возвращает копию словаря кошельков."""
-        return self._wallets.copy()
+    def version(self) -> int:
+        """Версия сохранённой записи (для оптимистичной блокировки)."""
+        return self._version
+
+    @version.setter
+    def version(self, value: int):
+        self._version = value
+
+    @property
+    def wallets(self) -> Mapping[str, Wallet]:
+        """Кошельки только для чтения (представление без копирования).
+
+        Добавлять валюты нужно через add_currency; представление сразу
+        отражает изменения портфеля.
+        """
+        return MappingProxyType(self._wallets)
 
     def add_currency(self, currency_code: str):
         """Добавляет новую валюту в портфель."""
@@ -173,16 +224,19 @@ class Portfolio:
         """Возвращает кошелёк по коду валюты."""
         return self._wallets.get(currency_code.upper())
 
-    def get_total_value(self, exchange_rates: dict, base_currency: str = "USD") -> float:
-        """Возвращает общую стоимость портфеля в базовой валюте."""
+    def get_total_value(self, exchange_rates, base_currency: str = "USD") -> float:
+        """Возвращает общую стоимость портфеля в базовой валюте.
+
+        exchange_rates — RateMatrix или словарь пар {PAIR_KEY: {"rate": ...}}.
+        """
+        from valutatrade_hub.core.rate_matrix import RateMatrix
+
+        if not isinstance(exchange_rates, RateMatrix):
+            exchange_rates = RateMatrix(exchange_rates)
+
         total = 0.0
         for code, wallet in self._wallets.items():
-            if code == base_currency:
-                total += wallet.balance
-            else:
-                pair_key = f"{code}_{base_currency}"
-                rate = exchange_rates.get(pair_key, {}).get("rate", 0)
-                total += wallet.balance * rate
+            total += wallet.balance * exchange_rates.rate(code, base_currency)
         return total
 
     def to_dict(self) -> dict:
@@ -190,4 +244,5 @@ class Portfolio:
         return {
             "user_id": self._user_id,
             "wallets": {code: w.to_dict() for code, w in self._wallets.items()},
+            "version": self._version,
         }
@@ -0,0 +1,138 @@
+"""Колоночное хранение балансов многих портфелей для массовых операций."""
+
+from array import array
+from typing import Dict, Iterable, Iterator
+
+from valutatrade_hub.core.currencies import (
+    currency_precision,
+    from_minor_units,
+    wallet_units,
+)
+from valutatrade_hub.core.models import Portfolio, Wallet
+from valutatrade_hub.core.rate_matrix import CURRENCY_CODES, CURRENCY_INDEX
+
+
+class PortfolioBook:
+    """Балансы портфелей в плоских массивах: строка на пользователя,
+    столбец на валюту (порядковый номер из CURRENCY_INDEX).
+
+    Баланс пользователя в строке row по валюте column (в минимальных
+    единицах, см. Wallet) лежит в units[row * width + column]; held в той
+    же ячейке равен 1, если кошелёк есть (в том числе с нулевым балансом).
+    Кошельки валют вне реестра хранятся в extra, чтобы portfolio() и
+    records() отдавали портфель без потерь.
+
+    units — array('q'), его можно без копирования обернуть в NumPy:
+    numpy.frombuffer(book.units, dtype=numpy.int64).reshape(len(book), book.width).
+    """
+
+    __slots__ = ("width", "precisions", "user_ids", "versions", "units", "held", "extra",
+                 "_rows")
+
+    def __init__(self):
+        self.width = len(CURRENCY_CODES)
+        self.precisions = tuple(currency_precision(code) for code in CURRENCY_CODES)
+        self.user_ids = array("q")
+        self.versions = array("q")
+        self.units = array("q")
+        self.held = array("B")
+        self.extra: Dict[int, Dict[str, int]] = {}
+        self._rows: Dict[int, int] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "PortfolioBook":
+        """Книга из записей портфелей в формате хранилища (Portfolio.to_dict)."""
+        book = cls()
+        for record in records:
+            book.add(record)
+        return book
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._rows
+
+    def add(self, record: dict) -> int:
+        """Добавляет портфель и возвращает номер его строки."""
+        user_id = record["user_id"]
+        if user_id in self._rows:
+            raise ValueError(f"Портфель пользователя {user_id} уже есть в книге")
+
+        row = len(self.user_ids)
+        units = [0] * self.width
+        held = bytearray(self.width)
+        for code, w_data in record.get("wallets", {}).items():
+            column = CURRENCY_INDEX.get(code)
+            if column is None:
+                self.extra.setdefault(row, {})[code] = wallet_units(w_data)
+            else:
+                units[column] = wallet_units(w_data)
+                held[column] = 1
+
+        self.user_ids.append(user_id)
+        self.versions.append(record.get("version", 0))
+        self.units.extend(units)
+        self.held.frombytes(held)
+        self._rows[user_id] = row
+        return row
+
+    def row(self, user_id: int) -> int:
+        """Номер строки пользователя (KeyError, если портфеля нет)."""
+        return self._rows[user_id]
+
+    def balance_units(self, user_id: int, currency_code: str) -> int:
+        """Баланс пользователя в минимальных единицах валюты (0, если кошелька нет)."""
+        row = self._rows[user_id]
+        code = currency_code.upper()
+        column = CURRENCY_INDEX.get(code)
+        if column is None:
+            return self.extra.get(row, {}).get(code, 0)
+        return self.units[row * self.width + column]
+
+    def balance(self, user_id: int, currency_code: str) -> float:
+        """Баланс пользователя в валюте (0.0, если кошелька нет)."""
+        units = self.balance_units(user_id, currency_code)
+        return from_minor_units(units, currency_precision(currency_code))
+
+    def holdings(self) -> Dict[str, int]:
+        """Точные суммы балансов по валютам (в минимальных единицах)."""
+        result = {}
+        for column, code in enumerate(CURRENCY_CODES):
+            total = sum(self.units[column::self.width])
+            if total:
+                result[code] = total
+        for wallets in self.extra.values():
+            for code, n in wallets.items():
+                result[code] = result.get(code, 0) + n
+        return result
+
+    def wallet_count(self) -> int:
+        """Число кошельков во всех портфелях."""
+        return self.held.count(1) + sum(len(w) for w in self.extra.values())
+
+    def _wallet_items(self, row: int) -> Iterator[tuple]:
+        start = row * self.width
+        held, units = self.held, self.units
+        for column, code in enumerate(CURRENCY_CODES):
+            if held[start + column]:
+                yield code, units[start + column]
+        yield from self.extra.get(row, {}).items()
+
+    def portfolio(self, user_id: int) -> Portfolio:
+        """Собирает объект Portfolio для одного пользователя."""
+        row = self._rows[user_id]
+        wallets = {code: Wallet(code, units=units) for code, units in self._wallet_items(row)}
+        return Portfolio(user_id, wallets, self.versions[row])
+
+    def records(self) -> Iterator[dict]:
+        """Портфели в формате хранилища, в порядке добавления."""
+        for row, user_id in enumerate(self.user_ids):
+            yield {
+                "user_id": user_id,
+                "wallets": {
+                    code: {"currency_code": code, "units": units}
+                    for code, units in self._wallet_items(row)
+                },
+                "version": self.versions[row],
+            }
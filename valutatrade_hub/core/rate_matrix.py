@@ -0,0 +1,114 @@
+"""Плотная матрица кросс-курсов по порядковым номерам валют."""
+
+import math
+from array import array
+from typing import Dict, Optional
+
+from valutatrade_hub.core.currencies import CURRENCY_REGISTRY
+
+CURRENCY_CODES = tuple(CURRENCY_REGISTRY)
+CURRENCY_INDEX: Dict[str, int] = {code: i for i, code in enumerate(CURRENCY_CODES)}
+
+PIVOT_CURRENCY = "USD"
+
+
+class RateMatrix:
+    """Матрица N×N: курс валюты i к валюте j лежит в ячейке i * N + j.
+
+    Строится один раз на срез курсов: прямые пары, обратные к ним и
+    кросс-курсы (в первую очередь через USD). Отсутствующий курс равен 0.0.
+    Рядом хранятся момент устаревания каждой ячейки (epoch) и updated_at
+    пары, от которой он взят: у прямой и обратной пары — значения исходной
+    пары (если переданы), у кросс-курса — той из пар, что устаревает раньше.
+    """
+
+    def __init__(self, pairs: dict, last_refresh: Optional[str] = None):
+        self.codes = CURRENCY_CODES
+        self.index = CURRENCY_INDEX
+        self.size = len(self.codes)
+        self.last_refresh = last_refresh
+
+        n = self.size
+        rates = array("d", bytes(8 * n * n))
+        for i in range(n):
+            rates[i * n + i] = 1.0
+
+        self._rates = rates
+        self._expires = array("d", [math.inf]) * (n * n)
+        self._updated: list = [None] * (n * n)
+        self._fill_pairs(pairs)
+        self._fill_cross()
+
+    def _fill_pairs(self, pairs: dict):
+        """Прямые пары и обратные к ним (прямые имеют приоритет)."""
+        n, rates, expires, updated = self.size, self._rates, self._expires, self._updated
+
+        inverse = []
+        for pair_key, pair_data in pairs.items():
+            from_code, _, to_code = pair_key.partition("_")
+            i = self.index.get(from_code)
+            j = self.index.get(to_code)
+            rate = pair_data.get("rate") if pair_data else None
+            if i is None or j is None or not rate or i == j:
+                continue
+            expires_at = pair_data.get("expires_at", math.inf)
+            updated_at = pair_data.get("updated_at")
+            rates[i * n + j] = rate
+            expires[i * n + j] = expires_at
+            updated[i * n + j] = updated_at
+            inverse.append((j, i, 1 / rate, expires_at, updated_at))
+
+        for i, j, rate, expires_at, updated_at in inverse:
+            if not rates[i * n + j]:
+                rates[i * n + j] = rate
+                expires[i * n + j] = expires_at
+                updated[i * n + j] = updated_at
+
+    def _fill_cross(self):
+        """Кросс-курсы через промежуточную валюту, начиная с USD."""
+        n, rates, expires, updated = self.size, self._rates, self._expires, self._updated
+
+        pivots = sorted(range(n), key=lambda k: self.codes[k] != PIVOT_CURRENCY)
+        for k in pivots:
+            for i in range(n):
+                via_k = rates[i * n + k]
+                if not via_k:
+                    continue
+                expires_via_k = expires[i * n + k]
+                for j in range(n):
+                    if not rates[i * n + j] and rates[k * n + j]:
+                        rates[i * n + j] = via_k * rates[k * n + j]
+                        # Ячейка наследует срок и updated_at пары, устаревающей раньше.
+                        oldest = i * n + k if expires_via_k <= expires[k * n + j] else k * n + j
+                        expires[i * n + j] = expires[oldest]
+                        updated[i * n + j] = updated[oldest]
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """Курс from_code → to_code или 0.0, если он неизвестен."""
+        i = self.index.get(from_code)
+        j = self.index.get(to_code)
+        if i is None or j is None:
+            return 0.0
+        return self._rates[i * self.size + j]
+
+    def expires_at(self, from_code: str, to_code: str) -> float:
+        """Момент устаревания курса from_code → to_code (epoch; inf — не устаревает)."""
+        i = self.index.get(from_code)
+        j = self.index.get(to_code)
+        if i is None or j is None:
+            return math.inf
+        return self._expires[i * self.size + j]
+
+    def updated_at(self, from_code: str, to_code: str) -> Optional[str]:
+        """updated_at пары, от которой взят курс from_code → to_code (None — неизвестен)."""
+        i = self.index.get(from_code)
+        j = self.index.get(to_code)
+        if i is None or j is None:
+            return None
+        return self._updated[i * self.size + j]
+
+    def column(self, to_code: str) -> list:
+        """Курсы всех валют (в порядке CURRENCY_CODES) к валюте to_code."""
+        j = self.index[to_code]
+        return list(self._rates[j::self.size])
+
@@ -0,0 +1,153 @@
+"""Разобранный в памяти срез курсов, общий для процесса."""
+
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Hashable, Optional
+
+from valutatrade_hub.core.rate_matrix import RateMatrix
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def parse_epoch(value: str) -> float:
+    """ISO-время (UTC, если зона не указана; допускается суффикс Z) → epoch-секунды."""
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _expiry(ttl_seconds: float, *moments: Optional[str]) -> float:
+    """Момент устаревания: самая поздняя из отметок плюс TTL.
+
+    Без отметок курс не устаревает; неразборчивая отметка считается
+    давно устаревшей.
+    """
+    epochs = []
+    for value in moments:
+        if not value:
+            continue
+        try:
+            epochs.append(parse_epoch(value))
+        except ValueError:
+            epochs.append(0.0)
+    return max(epochs) + ttl_seconds if epochs else math.inf
+
+
+class RateQuote:
+    """Курс одной пары с заранее посчитанным моментом устаревания (epoch)."""
+
+    __slots__ = ("rate", "updated_at", "source", "expires_at")
+
+    def __init__(self, rate: float, updated_at: Optional[str], source: Optional[str],
+                 expires_at: float):
+        self.rate = rate
+        self.updated_at = updated_at
+        self.source = source
+        self.expires_at = expires_at
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) <= self.expires_at
+
+
+class RateSnapshot:
+    """Неизменяемый срез курсов: пары по ключу "FROM_TO", матрица кросс-курсов.
+
+    Отметки времени разбираются и TTL применяется один раз, при построении;
+    курс, подтверждённый источником без изменений (read_rate_checks),
+    считается свежим от момента подтверждения. Обратный или кросс-курс
+    матрицы устаревает вместе с самой старой из пар, из которых он получен
+    (RateMatrix.expires_at).
+    """
+
+    __slots__ = ("quotes", "last_refresh", "version", "_matrix")
+
+    def __init__(self, rates_data: dict, checks: Optional[Dict[str, str]] = None,
+                 ttl_seconds: float = 300, version: Hashable = None):
+        checks = checks or {}
+        self.quotes: Dict[str, RateQuote] = {
+            pair: RateQuote(
+                data.get("rate"),
+                data.get("updated_at"),
+                data.get("source"),
+                _expiry(ttl_seconds, data.get("updated_at"), checks.get(pair)),
+            )
+            for pair, data in rates_data.get("pairs", {}).items()
+            if data
+        }
+        self.last_refresh = rates_data.get("last_refresh")
+        self.version = version
+        self._matrix: Optional[RateMatrix] = None
+
+    def quote(self, pair_key: str) -> Optional[RateQuote]:
+        """Сохранённый курс пары или None."""
+        return self.quotes.get(pair_key)
+
+    def usd_rate(self, currency_code: str) -> float:
+        """Курс валюты к USD из сохранённых пар (0, если его нет)."""
+        quote = self.quotes.get(f"{currency_code.upper()}_USD")
+        return (quote.rate if quote else 0) or 0
+
+    @property
+    def matrix(self) -> RateMatrix:
+        """Матрица прямых, обратных и кросс-курсов (строится при первом обращении)."""
+        if self._matrix is None:
+            self._matrix = RateMatrix(
+                {
+                    pair: {"rate": q.rate, "updated_at": q.updated_at, "expires_at": q.expires_at}
+                    for pair, q in self.quotes.items()
+                },
+                self.last_refresh,
+            )
+        return self._matrix
+
+
+_snapshot: Optional[RateSnapshot] = None
+_next_poll = 0.0
+_reload_lock = threading.Lock()
+
+
+def get_rate_snapshot() -> RateSnapshot:
+    """Текущий срез курсов процесса.
+
+    Версия курсов в хранилище (rates_version: сигнатуры файлов) проверяется
+    не чаще раза в RATES_POLL_SECONDS; в остальное время это чтение одной
+    ссылки. При изменении новый срез строится целиком и подменяет старый
+    одним присваиванием — читатели видят либо старый, либо новый срез.
+    """
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() < _next_poll:
+        return snapshot
+    return _poll()
+
+
+def invalidate_rate_snapshot():
+    """Проверить версию курсов при следующем обращении (после своей записи)."""
+    global _next_poll
+    _next_poll = 0.0
+
+
+def _poll() -> RateSnapshot:
+    global _snapshot, _next_poll
+
+    with _reload_lock:
+        storage = DatabaseManager().storage
+        # Версия читается до данных: если файл изменится между ними, срез
+        # просто перестроится ещё раз при следующей проверке.
+        version = storage.rates_version()
+        version = None if version is None else (storage.name, version)
+
+        snapshot = _snapshot
+        if snapshot is None or version is None or snapshot.version != version:
+            snapshot = RateSnapshot(
+                storage.read_rates(),
+                storage.read_rate_checks(),
+                SettingsLoader().rates_ttl_seconds,
+                version,
+            )
+            _snapshot = snapshot
+
+        _next_poll = time.monotonic() + SettingsLoader().rates_poll_seconds
+        return snapshot
@@ -1,114 +1,177 @@
 """Бизнес-логика: регистрация, аутентификация, buy/sell/get_rate."""
 
-from datetime import datetime, timedelta
+import math
+import random
+import time
 from typing import Optional
 
-from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.currencies import (
+    currency_precision,
+    from_minor_units,
+    get_currency,
+    to_minor_units,
+    wallet_units,
+)
 from valutatrade_hub.core.exceptions import (
     ApiRequestError,
     CurrencyNotFoundError,
     InsufficientFundsError,
+    VersionConflictError,
 )
 from valutatrade_hub.core.models import Portfolio, User, Wallet
+from valutatrade_hub.core.rate_snapshot import RateQuote, RateSnapshot, get_rate_snapshot
 from valutatrade_hub.decorators import log_action
 from valutatrade_hub.infra.database import DatabaseManager
-from valutatrade_hub.infra.settings import SettingsLoader
 
-settings = SettingsLoader()
 db = DatabaseManager()
 
 
 def register_user(username: str, password: str) -> dict:
     """Регистрирует нового пользователя."""
-    users = db.read_json(settings.users_file)
-
-    if any(u["username"] == username for u in users):
-        raise ValueError(f"Имя пользователя '{username}' уже занято")
-
-    user_id = max([u["user_id"] for u in users], default=0) + 1
-    user = User.create_user(user_id, username, password)
-
-    users.append(user.to_dict())
-    db.write_json(settings.users_file, users)
+    record = db.storage.create_user(
+        username,
+        lambda user_id: User.create_user(user_id, username, password).to_dict(),
+    )
+    user_id = record["user_id"]
 
-    portfolios = db.read_json(settings.portfolios_file)
-    portfolios.append({"user_id": user_id, "wallets": {}})
-    db.write_json(settings.portfolios_file, portfolios)
+    save_portfolio(Portfolio(user_id))
 
     return {"user_id": user_id, "username": username}
 
 
 def login_user(username: str, password: str) -> Optional[User]:
     """Выполняет вход пользователя."""
-    users = db.read_json(settings.users_file)
+    u_data = db.storage.get_user(username)
+    if u_data is None:
+        raise ValueError(f"Пользователь '{username}' не найден")
 
-    for u_data in users:
-        if u_data["username"] == username:
-            user = User(**u_data)
-            if user.verify_password(password):
-                return user
-            else:
-                raise ValueError("Неверный пароль")
+    user = User(**u_data)
+    if not user.verify_password(password):
+        raise ValueError("Неверный пароль")
+    return user
 
-    raise ValueError(f"Пользователь '{username}' не найден")
+
+def _portfolio_from_dict(p_data: dict) -> Portfolio:
+    wallets = {
+        code: Wallet(**w_data)
+        for code, w_data in p_data.get("wallets", {}).items()
+    }
+    return Portfolio(p_data["user_id"], wallets, p_data.get("version", 0))
 
 
 def load_portfolio(user_id: int) -> Portfolio:
     """Загружает портфель пользователя."""
-    portfolios = db.read_json(settings.portfolios_file)
-
-    for p_data in portfolios:
-        if p_data["user_id"] == user_id:
-            wallets = {
-                code: Wallet(**w_data)
-                for code, w_data in p_data.get("wallets", {}).items()
-            }
-            return Portfolio(user_id, wallets)
-
-    return Portfolio(user_id)
+    p_data = db.storage.get_portfolio(user_id)
+    return _portfolio_from_dict(p_data) if p_data else Portfolio(user_id)
 
 
 def save_portfolio(portfolio: Portfolio):
-    """Сохраняет портфель пользователя."""
-    portfolios = db.read_json(settings.portfolios_file)
-
-    for i, p_data in enumerate(portfolios):
-        if p_data["user_id"] == portfolio.user_id:
-            portfolios[i] = portfolio.to_dict()
-            break
-    else:
-        portfolios.append(portfolio.to_dict())
+    """Сохраняет портфель пользователя.
+
+    Если портфель успели изменить с момента загрузки, бросает
+    VersionConflictError.
+    """
+    stored = db.storage.save_portfolio(portfolio.to_dict())
+    portfolio.version = stored["version"]
+
+
+SAVE_ATTEMPTS = 5
+SAVE_RETRY_DELAY = 0.005
+
+
+def _update_portfolio(user_id: int, apply):
+    """Загружает портфель, применяет apply и сохраняет с проверкой версии.
+
+    apply(portfolio) возвращает (result, changed). При конфликте версий
+    портфель перечитывается и apply повторяется (до SAVE_ATTEMPTS раз,
+    со случайной паузой, чтобы конкурирующие процессы разошлись).
+    """
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        portfolio = load_portfolio(user_id)
+        result, changed = apply(portfolio)
+        if not changed:
+            return result
+        try:
+            save_portfolio(portfolio)
+            return result
+        except VersionConflictError:
+            if attempt == SAVE_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, SAVE_RETRY_DELAY * attempt))
+
+
+# Относительное расхождение float-баланса и его значения в минимальных
+# единицах, которое считается погрешностью представления, а не потерей.
+LOSSLESS_REL_TOL = 1e-12
+
+
+def migrate_balances(dry_run: bool = False) -> dict:
+    """Переводит сохранённые float-балансы в целые минимальные единицы.
+
+    Перевод без потерь: старый баланс может отличаться от нового только
+    погрешностью float (LOSSLESS_REL_TOL). Если хоть один кошелёк так не
+    переводится (например, точнее точности валюты), ничего не записывается
+    и бросается ValueError со списком таких кошельков.
+    """
+    stats = {"portfolios": 0, "wallets": 0, "legacy_wallets": 0, "migrated": 0}
+    pending = []
+    lossy = []
+
+    for record in db.storage.iter_portfolios():
+        stats["portfolios"] += 1
+        wallets = record.get("wallets", {})
+        stats["wallets"] += len(wallets)
+
+        legacy = [w_data for w_data in wallets.values() if "units" not in w_data]
+        if not legacy:
+            continue
+        for w_data in legacy:
+            balance = w_data.get("balance", 0)
+            units = wallet_units(w_data)
+            precision = currency_precision(w_data["currency_code"])
+            if not math.isclose(from_minor_units(units, precision), balance,
+                                rel_tol=LOSSLESS_REL_TOL):
+                lossy.append(f"user_id={record['user_id']} "
+                             f"{w_data['currency_code']}={balance!r}")
+        stats["legacy_wallets"] += len(legacy)
+        pending.append(record)
+
+    if lossy:
+        raise ValueError(
+            f"Балансы не переводятся без потерь ({len(lossy)}): {', '.join(lossy[:10])}"
+        )
 
-    db.write_json(settings.portfolios_file, portfolios)
+    if not dry_run:
+        for record in pending:
+            save_portfolio(_portfolio_from_dict(record))
+            stats["migrated"] += 1
+    return stats
 
 
-@log_action("BUY")
-def buy(user_id: int, currency_code: str, amount: float) -> dict:
-    """Покупка валюты."""
+def _validate_order(currency_code: str, amount: float):
     if amount <= 0:
         raise ValueError("'amount' должен быть положительным числом")
 
     try:
-        get_currency(currency_code)
+        currency = get_currency(currency_code)
     except CurrencyNotFoundError as e:
         raise e
 
-    portfolio = load_portfolio(user_id)
+    # Сумма должна выражаться целым числом минимальных единиц валюты.
+    to_minor_units(amount, currency.precision)
 
-    if currency_code.upper() not in portfolio.wallets:
-        portfolio.add_currency(currency_code)
 
+def _apply_buy(portfolio: Portfolio, currency_code: str, amount: float,
+               rate: float) -> dict:
     wallet = portfolio.get_wallet(currency_code)
+    if wallet is None:
+        portfolio.add_currency(currency_code)
+        wallet = portfolio.get_wallet(currency_code)
 
     old_balance = wallet.balance
     wallet.deposit(amount)
     new_balance = wallet.balance
 
-    save_portfolio(portfolio)
-
-    rates = db.read_json(settings.rates_file)
-    pair_key = f"{currency_code.upper()}_USD"
-    rate = rates.get("pairs", {}).get(pair_key, {}).get("rate", 0)
     estimated_cost = amount * rate if rate else None
 
     return {
@@ -121,18 +184,8 @@ def buy(user_id: int, currency_code: str, amount: float) -> dict:
     }
 
 
-@log_action("SELL")
-def sell(user_id: int, currency_code: str, amount: float) -> dict:
-    """Продажа валюты."""
-    if amount <= 0:
-        raise ValueError("'amount' должен быть положительным числом")
-
-    try:
-        get_currency(currency_code)
-    except CurrencyNotFoundError as e:
-        raise e
-
-    portfolio = load_portfolio(user_id)
+def _apply_sell(portfolio: Portfolio, currency_code: str, amount: float,
+                rate: float) -> dict:
     wallet = portfolio.get_wallet(currency_code)
 
     if not wallet:
@@ -148,11 +201,6 @@ def sell(user_id: int, currency_code: str, amount: float) -> dict:
         raise e
     new_balance = wallet.balance
 
-    save_portfolio(portfolio)
-
-    rates = db.read_json(settings.rates_file)
-    pair_key = f"{currency_code.upper()}_USD"
-    rate = rates.get("pairs", {}).get(pair_key, {}).get("rate", 0)
     estimated_revenue = amount * rate if rate else None
 
     return {
@@ -165,6 +213,128 @@ def sell(user_id: int, currency_code: str, amount: float) -> dict:
     }
 
 
+@log_action("BUY")
+def buy(user_id: int, currency_code: str, amount: float) -> dict:
+    """Покупка валюты."""
+    _validate_order(currency_code, amount)
+
+    rate = get_rate_snapshot().usd_rate(currency_code)
+    return _update_portfolio(
+        user_id,
+        lambda portfolio: (_apply_buy(portfolio, currency_code, amount, rate), True),
+    )
+
+
+@log_action("SELL")
+def sell(user_id: int, currency_code: str, amount: float) -> dict:
+    """Продажа валюты."""
+    _validate_order(currency_code, amount)
+
+    rate = get_rate_snapshot().usd_rate(currency_code)
+    return _update_portfolio(
+        user_id,
+        lambda portfolio: (_apply_sell(portfolio, currency_code, amount, rate), True),
+    )
+
+
+BATCH_ACTIONS = {"buy": _apply_buy, "sell": _apply_sell}
+BATCH_MODES = ("atomic", "best-effort")
+
+
+def _parse_order(order: dict) -> tuple:
+    """Проверяет заявку пакета и возвращает (action, currency, amount)."""
+    if not isinstance(order, dict):
+        raise ValueError("Заявка должна быть JSON-объектом")
+
+    action = str(order.get("action", "")).lower()
+    if action not in BATCH_ACTIONS:
+        raise ValueError(f"Неизвестное действие '{order.get('action')}' (buy/sell)")
+
+    currency_code = order.get("currency")
+    if not currency_code:
+        raise ValueError("Не указана валюта 'currency'")
+
+    try:
+        amount = float(order.get("amount"))
+    except (TypeError, ValueError):
+        raise ValueError("'amount' должен быть положительным числом") from None
+
+    _validate_order(currency_code, amount)
+    return action, currency_code, amount
+
+
+@log_action("BATCH")
+def execute_batch(user_id: int, orders: list, mode: str = "atomic") -> list:
+    """Исполняет пакет заявок buy/sell за одну загрузку и одно сохранение.
+
+    В режиме "atomic" первая же ошибка прерывает пакет и ничего не
+    сохраняется. В режиме "best-effort" ошибочные заявки пропускаются,
+    а для них возвращается {"currency", "amount", "error"}. Успешные
+    результаты имеют тот же вид, что и у buy/sell.
+    """
+    if mode not in BATCH_MODES:
+        raise ValueError(f"Неизвестный режим '{mode}'. Доступны: {', '.join(BATCH_MODES)}")
+    if not isinstance(orders, list):
+        raise ValueError("Пакет заявок должен быть списком")
+
+    parsed = []
+    for index, order in enumerate(orders, start=1):
+        try:
+            parsed.append(_parse_order(order))
+        except (ValueError, CurrencyNotFoundError) as e:
+            if mode == "atomic":
+                raise ValueError(f"Заявка #{index}: {e}") from e
+            parsed.append(e)
+
+    snapshot = get_rate_snapshot()
+    return _update_portfolio(
+        user_id, lambda portfolio: _apply_batch(portfolio, orders, parsed, snapshot, mode)
+    )
+
+
+def _apply_batch(portfolio: Portfolio, orders: list, parsed: list, snapshot: RateSnapshot,
+                 mode: str) -> tuple:
+    results = []
+    applied = 0
+    for index, (order, item) in enumerate(zip(orders, parsed), start=1):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            action, currency_code, amount = item
+            results.append(
+                BATCH_ACTIONS[action](
+                    portfolio, currency_code, amount, snapshot.usd_rate(currency_code)
+                )
+            )
+            applied += 1
+        except (ValueError, CurrencyNotFoundError, InsufficientFundsError) as e:
+            if mode == "atomic":
+                raise ValueError(f"Заявка #{index}: {e}") from e
+            fields = order if isinstance(order, dict) else {}
+            results.append({
+                "currency": fields.get("currency"),
+                "amount": fields.get("amount"),
+                "error": str(e),
+            })
+
+    return results, applied > 0
+
+
+def _derived_rate(snapshot: RateSnapshot, from_code: str, to_code: str) -> Optional[RateQuote]:
+    """Обратный или кросс-курс из матрицы среза.
+
+    Свежесть и updated_at — по самой старой из сохранённых пар, из которых
+    он получен.
+    """
+    matrix = snapshot.matrix
+    rate = matrix.rate(from_code, to_code)
+    if not rate:
+        return None
+
+    updated_at = matrix.updated_at(from_code, to_code) or snapshot.last_refresh
+    return RateQuote(rate, updated_at, "RateMatrix", matrix.expires_at(from_code, to_code))
+
+
 def get_rate(from_code: str, to_code: str) -> dict:
     """Получает курс валюты."""
     try:
@@ -173,32 +343,29 @@ def get_rate(from_code: str, to_code: str) -> dict:
     except CurrencyNotFoundError as e:
         raise e
 
-    rates = db.read_json(settings.rates_file)
-    pair_key = f"{from_code.upper()}_{to_code.upper()}"
+    from_code, to_code = from_code.upper(), to_code.upper()
+    snapshot = get_rate_snapshot()
+    quote = snapshot.quote(f"{from_code}_{to_code}") or _derived_rate(
+        snapshot, from_code, to_code
+    )
 
-    rate_data = rates.get("pairs", {}).get(pair_key)
-
-    if not rate_data:
+    if not quote:
         raise ApiRequestError(
             f"Курс {from_code}→{to_code} недоступен. Повторите попытку позже."
         )
 
-    updated_at_str = rate_data.get("updated_at")
-    if updated_at_str:
-        updated_at = datetime.fromisoformat(updated_at_str.replace("Z", ""))
-        age = datetime.utcnow() - updated_at
-        ttl = timedelta(seconds=settings.rates_ttl_seconds)
-
-        if age > ttl:
-            raise ApiRequestError(
-                f"Данные курса устарели (обновлено: {updated_at_str}). "
-                "Выполните 'update-rates'."
-            )
+    # Курс, подтверждённый источником без изменений, считается свежим
+    # (expires_at учитывает обе отметки, см. RateSnapshot).
+    if not quote.is_fresh():
+        raise ApiRequestError(
+            f"Данные курса устарели (обновлено: {quote.updated_at}). "
+            "Выполните 'update-rates'."
+        )
 
     return {
-        "from": from_code.upper(),
-        "to": to_code.upper(),
-        "rate": rate_data.get("rate"),
-        "updated_at": rate_data.get("updated_at"),
-        "source": rate_data.get("source"),
+        "from": from_code,
+        "to": to_code,
+        "rate": quote.rate,
+        "updated_at": quote.updated_at,
+        "source": quote.source,
     }
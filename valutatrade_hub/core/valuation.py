@@ -0,0 +1,146 @@
+"""Переоценка всех портфелей (mark-to-market) в нескольких базовых валютах."""
+
+import csv
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from valutatrade_hub.core.currencies import currency_precision, from_minor_units, get_currency
+from valutatrade_hub.core.portfolio_book import PortfolioBook
+from valutatrade_hub.core.rate_snapshot import get_rate_snapshot
+from valutatrade_hub.infra.database import DatabaseManager
+
+EXPORT_FORMATS = ("csv", "json")
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError(
+            "Для переоценки нужен NumPy: poetry install -E analytics"
+        ) from None
+    return numpy
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class _CsvSink:
+    def __init__(self, f, bases: List[str]):
+        self.writer = csv.writer(f)
+        self.writer.writerow(["user_id", *bases])
+
+    def write(self, user_id: int, totals):
+        self.writer.writerow([user_id, *(f"{v:.8f}" for v in totals)])
+
+    def close(self):
+        pass
+
+
+class _JsonSink:
+    def __init__(self, f, bases: List[str]):
+        self.f = f
+        self.bases = bases
+        self.first = True
+        f.write("[\n")
+
+    def write(self, user_id: int, totals):
+        record = {"user_id": user_id, "totals": dict(zip(self.bases, totals.tolist()))}
+        self.f.write(("  " if self.first else ",\n  ") + json.dumps(record))
+        self.first = False
+
+    def close(self):
+        self.f.write("\n]\n")
+
+
+def revalue_all(
+    bases: List[str],
+    output_path: str,
+    fmt: str = "csv",
+    chunk_size: int = 10000,
+) -> dict:
+    """Переоценивает все портфели и потоково пишет итоги по пользователям.
+
+    Портфели обрабатываются блоками по chunk_size пользователей: блок
+    собирается в PortfolioBook, его массив балансов в минимальных единицах
+    (пользователи × валюты) без копирования оборачивается в NumPy и
+    умножается на матрицу курсов за минимальную единицу (валюты × базы)
+    одной операцией.
+
+    Суммарные остатки по валютам (holdings, PortfolioBook.holdings)
+    считаются точно, в целых единицах; итоги totals — из них, по одному
+    умножению на валюту. Валюты, для которых нет курса к базе (в том числе
+    кошельки вне реестра), в итоги не входят и перечисляются в unpriced.
+    """
+    np = _require_numpy()
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат '{fmt}'. Доступны: {', '.join(EXPORT_FORMATS)}")
+    if chunk_size <= 0:
+        raise ValueError("'chunk-size' должен быть положительным числом")
+
+    bases = [get_currency(code).code for code in bases]
+
+    storage = DatabaseManager().storage
+    matrix = get_rate_snapshot().matrix
+    scales = np.array([10.0 ** currency_precision(code) for code in matrix.codes])
+    rate_block = np.array([matrix.column(code) for code in bases], dtype=np.float64).T
+    rate_block /= scales[:, None]
+
+    users = wallets = 0
+    holdings: Dict[str, int] = {}
+
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        sink = (_CsvSink if fmt == "csv" else _JsonSink)(f, bases)
+
+        for chunk in _chunks(storage.iter_portfolios(), chunk_size):
+            book = PortfolioBook.from_records(chunk)
+            units = np.frombuffer(book.units, dtype=np.int64).reshape(len(book), book.width)
+            totals = units @ rate_block
+            for code, n in book.holdings().items():
+                holdings[code] = holdings.get(code, 0) + n
+            wallets += book.wallet_count()
+
+            for user_id, user_totals in zip(book.user_ids, totals):
+                sink.write(user_id, user_totals)
+            users += len(book)
+
+        sink.close()
+
+    totals, unpriced = _grand_totals(holdings, bases, rate_block, matrix.index)
+    return {
+        "users": users,
+        "wallets": wallets,
+        "holdings": {
+            code: from_minor_units(n, currency_precision(code))
+            for code, n in holdings.items() if n
+        },
+        "totals": totals,
+        "unpriced": unpriced,
+        "output": output_path,
+        "last_refresh": matrix.last_refresh,
+    }
+
+
+def _grand_totals(holdings: Dict[str, int], bases: List[str], rate_block,
+                  index: Dict[str, int]) -> tuple:
+    """Итоги по базам и {база: [валюты без курса к ней]} для непустых остатков."""
+    totals = {}
+    unpriced = {}
+    for j, base in enumerate(bases):
+        total = 0.0
+        for code, n in holdings.items():
+            if not n:
+                continue
+            row = index.get(code)
+            rate = rate_block[row, j] if row is not None else 0.0
+            if rate:
+                total += float(n) * rate
+            else:
+                unpriced.setdefault(base, []).append(code)
+        totals[base] = total
+    return totals, {base: sorted(codes) for base, codes in unpriced.items()}
@@ -2,38 +2,118 @@
 
 import functools
 import logging
-from datetime import datetime
+import random
+import time
+from datetime import datetime, timezone
+from time import perf_counter_ns
+
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.metrics import MetricsRegistry
 
 logger = logging.getLogger("valutatrade_hub")
 
+LOG_LINE = "%s timestamp=%s args=%s kwargs=%s result=%s"
+
+
+class _Timestamp:
+    """Время вызова; в ISO-строку переводится только при форматировании записи."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def __str__(self) -> str:
+        return datetime.fromtimestamp(self.value, timezone.utc).replace(tzinfo=None).isoformat()
+
+    __repr__ = __str__
+
+
+def _fields(action_type, timestamp, args, kwargs, elapsed_ns, error=None) -> dict:
+    fields = {
+        "action": action_type,
+        "timestamp": timestamp,
+        "args": args,
+        "kwargs": kwargs,
+        "result": "OK" if error is None else "ERROR",
+    }
+    if elapsed_ns is not None:
+        fields["duration_ms"] = elapsed_ns / 1e6
+    if error is not None:
+        fields["error"] = str(error)
+        fields["error_type"] = type(error).__name__
+    return fields
+
+
+def _log_error(action_type, timestamp, args, kwargs, elapsed_ns, error):
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    if timestamp is None:
+        timestamp = _Timestamp(time.time())
+    logger.error(
+        LOG_LINE + " error=%s",
+        action_type, timestamp, args, kwargs, "ERROR", error,
+        extra={"fields": _fields(action_type, timestamp, args, kwargs, elapsed_ns, error)},
+    )
+
 
 def log_action(action_type: str):
-    """Декоратор для логирования доменных операций."""
+    """Декоратор для логирования доменных операций.
+
+    Кроме строки лога, время выполнения и тип исключения попадают в
+    MetricsRegistry (если метрики включены). Запись формируется лениво:
+    аргументы подставляются в сообщение уже в потоке логирования
+    (см. logging_config). Успешные вызовы можно прореживать через
+    LOG_SAMPLE, ошибки пишутся всегда. Если метрики выключены и уровень
+    INFO не пишется, время не измеряется вовсе: у ошибки тогда timestamp —
+    момент сбоя, а duration_ms нет. Настройки читаются при первом вызове,
+    а не при импорте декорированного модуля.
+    """
 
     def decorator(func):
+        state = None  # (MetricsRegistry, доля записываемых успешных вызовов)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            timestamp = datetime.utcnow().isoformat()
-            result_status = "OK"
-            error_msg = None
+            nonlocal state
+            if state is None:
+                state = (
+                    MetricsRegistry(),
+                    SettingsLoader().log_sample_rates.get(action_type.upper(), 1.0),
+                )
+            metrics, sample_rate = state
+            measure = metrics.enabled
+            log_info = logger.isEnabledFor(logging.INFO)
+            if not (measure or log_info):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    _log_error(action_type, None, args, kwargs, None, e)
+                    raise
+
+            timestamp = _Timestamp(time.time()) if log_info else None
+            started = perf_counter_ns()
 
             try:
                 result = func(*args, **kwargs)
-                logger.info(
-                    f"{action_type} timestamp={timestamp} "
-                    f"args={args} kwargs={kwargs} result={result_status}"
-                )
-                return result
             except Exception as e:
-                result_status = "ERROR"
-                error_msg = str(e)
-                logger.error(
-                    f"{action_type} timestamp={timestamp} "
-                    f"args={args} kwargs={kwargs} result={result_status} "
-                    f"error={error_msg}"
-                )
+                elapsed = perf_counter_ns() - started
+                if measure:
+                    metrics.record(action_type, elapsed, e)
+                _log_error(action_type, timestamp, args, kwargs, elapsed, e)
                 raise
 
+            elapsed = perf_counter_ns() - started
+            if measure:
+                metrics.record(action_type, elapsed)
+            if log_info and (sample_rate >= 1.0 or random.random() < sample_rate):
+                logger.info(
+                    LOG_LINE,
+                    action_type, timestamp, args, kwargs, "OK",
+                    extra={"fields": _fields(action_type, timestamp, args, kwargs, elapsed)},
+                )
+            return result
+
         return wrapper
 
     return decorator
@@ -1,8 +1,533 @@
-"""Singleton для работы с JSON-хранилищем."""
+"""Singleton для работы с хранилищем данных."""
 
+import codecs
+import contextlib
+import hashlib
+import itertools
 import json
+import mmap
 import os
-from typing import Any
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from valutatrade_hub.core.exceptions import VersionConflictError
+from valutatrade_hub.infra.settings import SettingsLoader
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+def file_signature(filepath: str) -> Optional[tuple]:
+    """Возвращает (mtime_ns, size, inode) файла или None, если его нет."""
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def copy_json(data: Any) -> Any:
+    """Быстрая глубокая копия JSON-совместимых данных."""
+    if isinstance(data, dict):
+        return {k: copy_json(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [copy_json(v) for v in data]
+    return data
+
+
+@contextlib.contextmanager
+def file_lock(lock_path: str):
+    """Эксклюзивная advisory-блокировка файла (no-op без fcntl)."""
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def next_version(current: Optional[dict], record: dict) -> dict:
+    """Оптимистическая проверка версии записи перед сохранением.
+
+    Если у record есть поле "version", оно должно совпадать с версией
+    сохранённой записи (0 — записи ещё нет); возвращается копия record
+    с увеличенной версией. Иначе — VersionConflictError.
+    """
+    expected = record.get("version")
+    if expected is None:
+        return record
+
+    stored = (current or {}).get("version", 0)
+    if stored != expected:
+        raise VersionConflictError(expected, stored)
+    return {**record, "version": expected + 1}
+
+
+JSON_READ_CHUNK = 64 * 1024
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Хвост блока, который может оказаться продолжением обрезанного числа.
+_NUMBER_TAIL = re.compile(r"[0-9eE.+-]*\Z")
+
+
+def _byte_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class JsonArrayScanner:
+    """Потоковый разбор верхнеуровневого JSON-массива из UTF-8 файла.
+
+    Файл читается блоками по chunk_size байт, элементы разбираются по
+    одному, и для каждого известны смещение и длина в байтах — по ним
+    элемент можно потом прочитать отдельно (read_json_at). В памяти
+    держится только текущий блок и текущий элемент.
+    """
+
+    def __init__(self, f, chunk_size: int = JSON_READ_CHUNK):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._offset = 0  # байтовое смещение символа _buf[_pos]
+        self._eof = False
+
+    def __iter__(self) -> Iterator[Tuple[int, int, Any]]:
+        """Кортежи (offset, length, element) в порядке следования."""
+        if self._next_token("[") is None:
+            return
+        self._skip_whitespace()
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._element()
+            if self._next_token(",]") == "]":
+                return
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(self._chunk_size)
+        self._buf = self._buf[self._pos:] + self._text.decode(data, final=not data)
+        self._pos = 0
+        self._eof = not data
+        return bool(data)
+
+    def _skip_whitespace(self):
+        while True:
+            end = _WHITESPACE.match(self._buf, self._pos).end()
+            self._offset += end - self._pos
+            self._pos = end
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def _peek(self) -> str:
+        return self._buf[self._pos] if self._pos < len(self._buf) else ""
+
+    def _next_token(self, expected: str) -> Optional[str]:
+        self._skip_whitespace()
+        char = self._peek()
+        if not char and expected == "[":
+            return None  # пустой файл
+        if not char or char not in expected:
+            raise json.JSONDecodeError(
+                f"Ожидался один из символов {expected!r}", self._buf, self._pos
+            )
+        self._pos += 1
+        self._offset += 1
+        return char
+
+    def _element(self) -> Tuple[int, int, Any]:
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # Число у самого края блока может быть обрезано ("12" из "12.5").
+                if self._eof or not _NUMBER_TAIL.match(self._buf, end):
+                    break
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+        offset = self._offset
+        length = _byte_len(self._buf[self._pos:end])
+        self._offset += length
+        self._pos = end
+        return offset, length, value
+
+
+def _has_utf16_bom(filepath: str) -> bool:
+    with open(filepath, "rb") as f:
+        return f.read(2) in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def iter_json_array(filepath: str) -> Iterator[Tuple[int, int, Any]]:
+    """(offset, length, element) для каждого элемента массива в файле."""
+    with open(filepath, "rb") as f:
+        yield from JsonArrayScanner(f)
+
+
+def _scan_records(f) -> Iterator[Any]:
+    with f:
+        for _, _, record in JsonArrayScanner(f):
+            yield record
+
+
+def read_json_at(f, offset: int, length: int) -> Any:
+    """Разбирает один элемент по смещению и длине из открытого (rb) файла."""
+    f.seek(offset)
+    return json.loads(f.read(length))
+
+
+# Сайдкар-индекс <file>.<key>.idx: заголовок (магия, mtime_ns, размер и
+# inode файла данных, число записей) и записи (hash64(key), offset, length),
+# отсортированные по хешу. Поиск — двоичный, через mmap, без загрузки индекса.
+INDEX_MAGIC = b"VTIDX001"
+_INDEX_HEADER = struct.Struct("<8sqqqq")
+_INDEX_ENTRY = struct.Struct("<QQQ")
+
+
+def index_path(filepath: str, key: str) -> str:
+    return f"{filepath}.{key}.idx"
+
+
+def _key_hash(value: Any) -> int:
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _write_index(path: str, signature: tuple, entries: List[Tuple[int, int, int]]):
+    entries.sort()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, *signature, len(entries)))
+        for entry in entries:
+            f.write(_INDEX_ENTRY.pack(*entry))
+    os.replace(tmp, path)
+
+
+def _index_spans(path: str, signature: tuple, value: Any) -> Optional[List[Tuple[int, int]]]:
+    """(offset, length) записей с таким хешем ключа; None — индекса нет или он устарел."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_INDEX_HEADER.size)
+            if len(header) < _INDEX_HEADER.size:
+                return None
+            magic, mtime_ns, size, inode, count = _INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC or (mtime_ns, size, inode) != signature:
+                return None
+            if not count:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _search_index(mm, count, _key_hash(value))
+    except (FileNotFoundError, ValueError, struct.error):
+        return None
+
+
+def _search_index(mm, count: int, target: int) -> List[Tuple[int, int]]:
+    def entry(i):
+        return _INDEX_ENTRY.unpack_from(mm, _INDEX_HEADER.size + i * _INDEX_ENTRY.size)
+
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if entry(mid)[0] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    spans = []
+    while lo < count:
+        key_hash, offset, length = entry(lo)
+        if key_hash != target:
+            break
+        spans.append((offset, length))
+        lo += 1
+    return spans
+
+
+def build_json_index(filepath: str, key: str):
+    """Строит сайдкар-индекс по полю key для JSON-массива filepath."""
+    with open(filepath, "rb") as f:
+        st = os.fstat(f.fileno())
+        entries = [
+            (_key_hash(record[key]), offset, length)
+            for offset, length, record in JsonArrayScanner(f)
+            if isinstance(record, dict) and key in record
+        ]
+    _write_index(index_path(filepath, key), (st.st_mtime_ns, st.st_size, st.st_ino), entries)
+
+
+def find_json_record(filepath: str, key: str, value: Any) -> Optional[dict]:
+    """Запись JSON-массива с record[key] == value без разбора всего файла.
+
+    Если есть актуальный индекс по key — чтение одной записи по смещению,
+    иначе потоковый просмотр до первого совпадения.
+    """
+    try:
+        f = open(filepath, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        st = os.fstat(f.fileno())
+        spans = _index_spans(
+            index_path(filepath, key), (st.st_mtime_ns, st.st_size, st.st_ino), value
+        )
+        if spans is None:
+            for _, _, record in JsonArrayScanner(f):
+                if isinstance(record, dict) and record.get(key) == value:
+                    return record
+            return None
+
+        for offset, length in spans:
+            record = read_json_at(f, offset, length)
+            if record.get(key) == value:
+                return record
+        return None
+
+
+def write_json_array(filepath: str, records: Iterable[dict],
+                     index_keys: Sequence[str] = (), index_min_bytes: int = 0):
+    """Потоково и атомарно пишет массив записей (формат как у json.dump с indent=2).
+
+    Для полей index_keys одновременно строятся сайдкар-индексы — если
+    итоговый файл не меньше index_min_bytes; иначе старые индексы удаляются.
+    """
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    tmp = filepath + ".tmp"
+    entries: Dict[str, List[Tuple[int, int, int]]] = {key: [] for key in index_keys}
+
+    with open(tmp, "wb") as f:
+        f.write(b"[")
+        offset = 1
+        for i, record in enumerate(records):
+            chunk = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            data = chunk.encode("utf-8")
+            prefix = b",\n  " if i else b"\n  "
+            f.write(prefix)
+            f.write(data)
+            offset += len(prefix)
+            for key, key_entries in entries.items():
+                key_entries.append((_key_hash(record.get(key)), offset, len(data)))
+            offset += len(data)
+        f.write(b"\n]" if offset > 1 else b"]")
+        f.flush()
+        st = os.fstat(f.fileno())
+
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    for key, key_entries in entries.items():
+        if st.st_size >= index_min_bytes:
+            _write_index(index_path(filepath, key), signature, key_entries)
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(index_path(filepath, key))
+    os.replace(tmp, filepath)
+
+
+class JournaledCollection:
+    """Коллекция записей: JSON-снапшот плюс журнал изменений.
+
+    Каждая мутация дописывается в `<file>.journal` одной компактной строкой
+    (JSON Lines) с полной новой версией записи, поэтому повторное применение
+    журнала идемпотентно. При достижении порога записей журнал сворачивается
+    в снапшот, а сам журнал обнуляется.
+
+    Снапшот не меньше JSON_STREAM_MIN_BYTES в память не загружается:
+    в _records лежат только записи журнала, а остальные читаются из
+    снапшота по одной (DatabaseManager.find_record) или потоково.
+    """
+
+    def __init__(self, db: "DatabaseManager", filepath: str, key: str,
+                 compact_threshold: int = 1000):
+        self._db = db
+        self.filepath = filepath
+        self.journal_path = filepath + ".journal"
+        self.lock_path = filepath + ".lock"
+        self.key = key
+        self.compact_threshold = compact_threshold
+
+        self._records: Dict[Any, dict] = {}
+        self._streaming = False
+        self._snapshot_sig = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, key_value: Any) -> Optional[dict]:
+        """Возвращает запись по ключу или None."""
+        with self._lock:
+            self._refresh()
+            return self._current(key_value)
+
+    def all(self) -> Iterator[dict]:
+        """Возвращает все записи (снапшот + журнал)."""
+        with self._lock:
+            self._refresh()
+            if not self._streaming:
+                return iter(list(self._records.values()))
+            return self._merged(dict(self._records))
+
+    def _current(self, key_value: Any) -> Optional[dict]:
+        record = self._records.get(key_value)
+        if record is None and self._streaming:
+            record = self._db.find_record(self.filepath, self.key, key_value)
+        return record
+
+    def _merged(self, overlay: Dict[Any, dict]) -> Iterator[dict]:
+        """Записи снапшота (потоково), кроме заменённых в overlay, затем overlay."""
+        snapshot = self._db.iter_records(self.filepath)
+        key = self.key
+        return itertools.chain(
+            (record for record in snapshot if record[key] not in overlay),
+            list(overlay.values()),
+        )
+
+    def put(self, record: dict) -> dict:
+        """Дописывает новую версию записи в журнал и возвращает её."""
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+
+            record = next_version(self._current(record[self.key]), record)
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            with open(self.journal_path, "ab") as f:
+                f.write(line.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Перечитываем хвост журнала, а не применяем запись напрямую:
+            # так сохраняется порядок относительно записей других процессов.
+            self._replay_journal()
+
+            if self._journal_entries >= self.compact_threshold:
+                self._compact()
+
+        return record
+
+    def compact(self):
+        """Принудительно сворачивает журнал в снапшот."""
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        self._replay_journal()
+        if self._streaming:
+            records = self._merged(self._records)
+        else:
+            records = list(self._records.values())
+        self._db.write_json_array(self.filepath, records, index_keys=(self.key,))
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+
+        self._snapshot_sig = file_signature(self.filepath)
+        self._journal_offset = 0
+        self._journal_entries = 0
+        if self._streaming or self._db.is_large(self.filepath):
+            self._streaming = True
+            self._records = {}
+
+    def _refresh(self):
+        sig = file_signature(self.filepath)
+        if not self._loaded or sig != self._snapshot_sig:
+            self._load_snapshot(sig)
+        self._replay_journal()
+
+    def _load_snapshot(self, sig):
+        self._streaming = self._db.is_large(self.filepath)
+        data = [] if self._streaming else self._db.read_json(self.filepath, default=[])
+        self._records = {r[self.key]: r for r in data}
+        self._snapshot_sig = sig
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._loaded = True
+
+    def _replay_journal(self):
+        try:
+            size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            size = 0
+
+        if size < self._journal_offset:
+            # Журнал был свёрнут другим процессом — перечитываем снапшот.
+            self._load_snapshot(file_signature(self.filepath))
+        if size == self._journal_offset:
+            return
+
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            chunk = f.read()
+
+        end = chunk.rfind(b"\n") + 1
+        for raw in chunk[:end].splitlines():
+            if raw:
+                record = json.loads(raw)
+                self._records[record[self.key]] = record
+                self._journal_entries += 1
+
+        self._journal_offset += end
+
+
+class ShardedCollection:
+    """Записи, разложенные по файлам-шардам `shard_NNN.json` по хешу ключа.
+
+    Каждый шард — JSON-объект {str(key): record}. Запись в шард идёт под
+    advisory-блокировкой `<shard>.lock` и с проверкой версии, поэтому
+    процессы, работающие с разными шардами, не мешают друг другу, а
+    конкурентные изменения одной записи не теряются.
+    """
+
+    def __init__(self, db: "DatabaseManager", directory: str, shards: int):
+        self._db = db
+        self.directory = directory
+        self.shards = shards
+
+    def shard_path(self, key_value: Any) -> str:
+        """Путь к шарду, в котором лежит запись с данным ключом."""
+        bucket = zlib.crc32(str(key_value).encode("utf-8")) % self.shards
+        return os.path.join(self.directory, f"shard_{bucket:03d}.json")
+
+    def get(self, key_value: Any) -> Optional[dict]:
+        """Возвращает запись по ключу или None."""
+        shard = self._db.read_json(self.shard_path(key_value), default={})
+        return shard.get(str(key_value))
+
+    def put(self, key_value: Any, record: dict) -> dict:
+        """Сохраняет запись (с проверкой версии) и возвращает её."""
+        path = self.shard_path(key_value)
+        with file_lock(path + ".lock"):
+            shard = self._db.read_json(path, default={})
+            record = next_version(shard.get(str(key_value)), record)
+            shard[str(key_value)] = record
+            self._db.write_json(path, shard)
+        return record
+
+    def all(self) -> Iterator[dict]:
+        """Итерирует записи всех шардов."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("shard_") and name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                yield from self._db.read_json(path, default={}).values()
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.directory)
 
 
 class DatabaseManager:
@@ -13,21 +538,51 @@ class DatabaseManager:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._journals = {}
+            cls._instance._storage = None
+            cls._instance._cache = OrderedDict()
+            cls._instance._cache_bytes = 0
+            cls._instance._cache_hits = 0
+            cls._instance._cache_misses = 0
+            cls._instance._cache_lock = threading.Lock()
         return cls._instance
 
-    def read_json(self, filepath: str) -> Any:
-        """Читает данные из JSON-файла."""
-        if not os.path.exists(filepath):
-            if filepath.endswith(("users.json", "portfolios.json", "exchange_rates.json")):
-                return []
-            return {"pairs": {}, "last_refresh": None}
+    # Настройки читаются при первом обращении, а не при создании (импорте).
+    @property
+    def cache_max_bytes(self) -> int:
+        return SettingsLoader().json_cache_max_bytes
+
+    @property
+    def stream_min_bytes(self) -> int:
+        return SettingsLoader().json_stream_min_bytes
+
+    def read_json(self, filepath: str, default: Any = None) -> Any:
+        """Читает данные из JSON-файла; если файла нет — возвращает default.
+
+        Разобранный документ кешируется по (mtime_ns, size, inode) файла;
+        вызывающий код всегда получает собственную копию.
+        """
+        signature = file_signature(filepath)
+        if signature is None:
+            return default
+
+        with self._cache_lock:
+            entry = self._cache.get(filepath)
+            if entry is not None and entry[0] == signature:
+                self._cache.move_to_end(filepath)
+                self._cache_hits += 1
+                return copy_json(entry[1])
+            self._cache_misses += 1
 
         try:
             with open(filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
+                data = json.load(f)
         except UnicodeDecodeError:
             with open(filepath, "r", encoding="utf-16") as f:
-                return json.load(f)
+                data = json.load(f)
+
+        self._cache_put(filepath, signature, data)
+        return copy_json(data)
 
     def write_json(self, filepath: str, data: Any):
         """Записывает данные в JSON-файл атомарно."""
@@ -38,3 +593,95 @@ class DatabaseManager:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
         os.replace(temp_filepath, filepath)
+        self.invalidate(filepath)
+
+    def write_json_array(self, filepath: str, records: Iterable[dict],
+                         index_keys: Sequence[str] = ()):
+        """Атомарно пишет массив записей; для больших файлов — с индексами index_keys."""
+        write_json_array(filepath, records, index_keys, self.stream_min_bytes)
+        self.invalidate(filepath)
+
+    def is_large(self, filepath: str) -> bool:
+        """Файл не меньше JSON_STREAM_MIN_BYTES: его не загружают целиком ради одной записи."""
+        signature = file_signature(filepath)
+        return signature is not None and signature[1] >= self.stream_min_bytes
+
+    def find_record(self, filepath: str, key: str, value: Any) -> Optional[dict]:
+        """Запись JSON-массива с record[key] == value или None.
+
+        Небольшие файлы читаются целиком через кеш read_json; большие —
+        по сайдкар-индексу или потоковым просмотром (find_json_record).
+        """
+        if self.is_large(filepath):
+            try:
+                return find_json_record(filepath, key, value)
+            except UnicodeDecodeError:
+                pass  # не UTF-8 (старые файлы в UTF-16) — читаем целиком
+        for record in self.read_json(filepath, default=[]):
+            if record.get(key) == value:
+                return record
+        return None
+
+    def iter_records(self, filepath: str) -> Iterator[dict]:
+        """Записи JSON-массива; большие UTF-8 файлы читаются потоково."""
+        if self.is_large(filepath) and not _has_utf16_bom(filepath):
+            # Файл открывается сразу: итератор видит снапшот на момент вызова,
+            # даже если файл потом заменят.
+            return _scan_records(open(filepath, "rb"))
+        return iter(self.read_json(filepath, default=[]))
+
+    def invalidate(self, filepath: str):
+        """Удаляет файл из кеша разобранных документов."""
+        with self._cache_lock:
+            entry = self._cache.pop(filepath, None)
+            if entry is not None:
+                self._cache_bytes -= entry[2]
+
+    def cache_stats(self) -> dict:
+        """Счётчики кеша read_json."""
+        with self._cache_lock:
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "entries": len(self._cache),
+                "bytes": self._cache_bytes,
+                "max_bytes": self.cache_max_bytes,
+            }
+
+    def _cache_put(self, filepath: str, signature: tuple, data: Any):
+        size = signature[1]
+        with self._cache_lock:
+            old = self._cache.pop(filepath, None)
+            if old is not None:
+                self._cache_bytes -= old[2]
+            if size > self.cache_max_bytes:
+                return
+
+            self._cache[filepath] = (signature, data, size)
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, (_, _, evicted) = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted
+
+    def journal(self, filepath: str, key: str,
+                compact_threshold: int = 1000) -> JournaledCollection:
+        """Возвращает журналируемую коллекцию для JSON-файла (одна на путь)."""
+        collection = self._journals.get(filepath)
+        if collection is None:
+            collection = JournaledCollection(self, filepath, key, compact_threshold)
+            self._journals[filepath] = collection
+        return collection
+
+    def sharded(self, directory: str, shards: int) -> ShardedCollection:
+        """Возвращает шардированную коллекцию в каталоге directory."""
+        return ShardedCollection(self, directory, shards)
+
+    @property
+    def storage(self):
+        """Бэкенд хранения, выбранный настройкой STORAGE_BACKEND."""
+        from valutatrade_hub.infra.storage import create_storage
+
+        name = SettingsLoader().storage_backend
+        if self._storage is None or self._storage.name != name:
+            self._storage = create_storage(name)
+        return self._storage
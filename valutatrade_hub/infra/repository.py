@@ -0,0 +1,105 @@
+"""Индексированный репозиторий пользователей поверх users.json."""
+
+import threading
+from itertools import chain
+from typing import Callable, Dict, List, Optional
+
+from valutatrade_hub.infra.database import DatabaseManager, file_lock, file_signature
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+class UserRepository:
+    """Singleton: хеш-индекс username → запись и аллокатор user_id.
+
+    Файл перечитывается только при изменении его mtime/размера, поэтому
+    поиск пользователя — это O(1) обращение к словарю. Большой файл
+    (JSON_STREAM_MIN_BYTES) ради входа не загружается: запись ищется по
+    сайдкар-индексу или потоковым просмотром; целиком он читается только
+    при регистрации.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.settings = SettingsLoader()
+        self.db = DatabaseManager()
+
+        self._records: List[dict] = []
+        self._by_username: Dict[str, dict] = {}
+        self._next_id = 1
+        self._signature = None
+        self._loaded_path = None
+        self._lock = threading.Lock()
+
+        self._initialized = True
+
+    @property
+    def filepath(self) -> str:
+        return self.settings.users_file
+
+    def get_by_username(self, username: str) -> Optional[dict]:
+        """Возвращает запись пользователя по имени или None."""
+        with self._lock:
+            if not self._is_loaded() and self.db.is_large(self.filepath):
+                return self.db.find_record(self.filepath, "username", username)
+            self._refresh()
+            return self._by_username.get(username)
+
+    def create(self, username: str, make_record: Callable[[int], dict]) -> dict:
+        """Создаёт пользователя: выделяет user_id и сохраняет запись.
+
+        `make_record(user_id)` вызывается под блокировкой и должен вернуть
+        сериализованного пользователя.
+        """
+        with self._lock, file_lock(self.filepath + ".lock"):
+            self._refresh()
+
+            if username in self._by_username:
+                raise ValueError(f"Имя пользователя '{username}' уже занято")
+
+            record = make_record(self._next_id)
+
+            # Индекс обновляется только после успешной записи файла.
+            self.db.write_json_array(
+                self.filepath, chain(self._records, (record,)), index_keys=("user_id", "username")
+            )
+            self._add_to_index(record)
+            self._signature = self._file_state()
+
+        return record
+
+    def _is_loaded(self) -> bool:
+        return self._file_state() == self._signature and self._loaded_path == self.filepath
+
+    def _refresh(self):
+        signature = self._file_state()
+        if signature == self._signature and self._loaded_path == self.filepath:
+            return
+
+        self._records = []
+        self._by_username = {}
+        self._next_id = 1
+        for record in self.db.iter_records(self.filepath):
+            self._add_to_index(record)
+
+        self._signature = signature
+        self._loaded_path = self.filepath
+
+    def _file_state(self):
+        """(mtime_ns, size) файла пользователей."""
+        signature = file_signature(self.filepath)
+        return signature[:2] if signature else None
+
+    def _add_to_index(self, record: dict):
+        self._records.append(record)
+        self._by_username[record["username"]] = record
+        self._next_id = max(self._next_id, record["user_id"] + 1)
@@ -2,6 +2,24 @@
 
 import os
 
+_env_loaded = False
+
+
+def load_env():
+    """Однократно загружает переменные из .env (уже заданные не меняются).
+
+    Вызывается при первом обращении к настройкам, а не при импорте, чтобы
+    запуск CLI не платил за python-dotenv раньше, чем настройки нужны.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
 
 class SettingsLoader:
     """Singleton для загрузки и кеширования конфигурации."""
@@ -18,20 +36,60 @@ class SettingsLoader:
         if self._initialized:
             return
 
+        load_env()
+
         self.data_dir = os.getenv("DATA_DIR", "data")
         self.users_file = os.path.join(self.data_dir, "users.json")
         self.portfolios_file = os.path.join(self.data_dir, "portfolios.json")
         self.rates_file = os.path.join(self.data_dir, "rates.json")
-        self.exchange_rates_file = os.path.join(
-            self.data_dir, "exchange_rates.json"
+        self.history_dir = os.path.join(self.data_dir, "history")
+
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "json")
+        self.sqlite_file = os.getenv(
+            "SQLITE_FILE", os.path.join(self.data_dir, "valutatrade.db")
+        )
+
+        self.json_cache_max_bytes = int(
+            os.getenv("JSON_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        )
+        # JSON-массивы от этого размера не загружаются целиком ради одной
+        # записи: поиск идёт по сайдкар-индексу или потоковым просмотром.
+        self.json_stream_min_bytes = int(
+            os.getenv("JSON_STREAM_MIN_BYTES", 64 * 1024 * 1024)
         )
 
+        self.journal_enabled = os.getenv("JOURNAL_ENABLED", "1") == "1"
+        self.journal_compact_threshold = int(
+            os.getenv("JOURNAL_COMPACT_THRESHOLD", 1000)
+        )
+
+        self.portfolio_layout = os.getenv("PORTFOLIO_LAYOUT", "single")
+        self.portfolio_shards = int(os.getenv("PORTFOLIO_SHARDS", 64))
+        self.portfolios_dir = os.path.join(self.data_dir, "portfolios")
+
         self.rates_ttl_seconds = int(os.getenv("RATES_TTL_SECONDS", 300))
+        # Как часто процесс проверяет, не изменились ли курсы на диске.
+        self.rates_poll_seconds = float(os.getenv("RATES_POLL_SECONDS", 1.0))
 
         self.default_base_currency = os.getenv("BASE_CURRENCY", "USD")
 
+        self.api_host = os.getenv("API_HOST", "127.0.0.1")
+        self.api_port = int(os.getenv("API_PORT", 8080))
+        self.api_session_ttl_seconds = int(os.getenv("API_SESSION_TTL_SECONDS", 3600))
+
+        self.metrics_enabled = os.getenv("METRICS_ENABLED", "1") == "1"
+        self.metrics_file = os.getenv("METRICS_FILE", "")
+        self.metrics_export_interval = float(os.getenv("METRICS_EXPORT_INTERVAL", 15))
+
         self.log_file = os.getenv("LOG_FILE", "logs/actions.log")
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        self.log_format = os.getenv("LOG_FORMAT", "text")
+        # Доля успешных операций, попадающих в лог: "BUY=0.1,SELL=0.1".
+        # Ошибки пишутся всегда.
+        self.log_sample_rates = _parse_rates(os.getenv("LOG_SAMPLE", ""))
+        self.log_batch_size = int(os.getenv("LOG_BATCH_SIZE", 256))
+        self.log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", 0))
+        self.log_flush_interval = float(os.getenv("LOG_FLUSH_INTERVAL", 0.05))
 
         self._initialized = True
 
@@ -43,3 +101,14 @@ class SettingsLoader:
         """Перезагрузить настройки (для будущего расширения)."""
         self._initialized = False
         self.__init__()
+
+
+def _parse_rates(value: str) -> dict:
+    """Разбирает строку вида "BUY=0.1,SELL=0.5" в {"BUY": 0.1, "SELL": 0.5}."""
+    rates = {}
+    for item in value.split(","):
+        name, sep, rate = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        rates[name.strip().upper()] = min(max(float(rate), 0.0), 1.0)
+    return rates
@@ -0,0 +1,531 @@
+"""Подключаемые бэкенды хранения: JSON-файлы и SQLite."""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from valutatrade_hub.core.currencies import (
+    currency_precision,
+    from_minor_units,
+    wallet_units,
+)
+from valutatrade_hub.infra.database import (
+    DatabaseManager,
+    ShardedCollection,
+    file_lock,
+    file_signature,
+    next_version,
+)
+from valutatrade_hub.infra.repository import UserRepository
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def empty_rates() -> dict:
+    """Пустой срез курсов."""
+    return {"pairs": {}, "last_refresh": None}
+
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища пользователей, портфелей и курсов."""
+
+    name = "abstract"
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[dict]:
+        """Возвращает запись пользователя по имени или None."""
+
+    @abstractmethod
+    def create_user(self, username: str, make_record: Callable[[int], dict]) -> dict:
+        """Выделяет user_id, создаёт и сохраняет пользователя."""
+
+    @abstractmethod
+    def get_portfolio(self, user_id: int) -> Optional[dict]:
+        """Возвращает сериализованный портфель или None."""
+
+    @abstractmethod
+    def save_portfolio(self, record: dict) -> dict:
+        """Сохраняет портфель и возвращает сохранённую запись.
+
+        Если в record есть "version", она сверяется с сохранённой
+        (VersionConflictError при расхождении) и увеличивается на 1.
+        """
+
+    @abstractmethod
+    def iter_portfolios(self) -> Iterator[dict]:
+        """Итерирует все портфели."""
+
+    @abstractmethod
+    def iter_users(self) -> Iterator[dict]:
+        """Итерирует всех пользователей."""
+
+    @abstractmethod
+    def read_rates(self) -> dict:
+        """Возвращает срез курсов {"pairs": ..., "last_refresh": ...}."""
+
+    @abstractmethod
+    def write_rates(self, data: dict):
+        """Сохраняет срез курсов целиком."""
+
+    @abstractmethod
+    def read_rate_checks(self) -> Dict[str, str]:
+        """Возвращает {pair: checked_at} — когда курс последний раз подтверждён."""
+
+    @abstractmethod
+    def mark_rates_checked(self, pairs: Iterable[str], checked_at: str):
+        """Отмечает, что курсы пар подтверждены источником без изменений."""
+
+    def rates_version(self) -> Hashable:
+        """Дешёвый признак версии курсов и отметок проверки: меняется при их записи.
+
+        None — версия неизвестна, курсы нужно перечитывать каждый раз.
+        """
+        return None
+
+
+class JsonStorage(StorageBackend):
+    """Хранилище в JSON-файлах каталога данных."""
+
+    name = "json"
+
+    def __init__(self):
+        self.settings = SettingsLoader()
+        self.db = DatabaseManager()
+        self.users = UserRepository()
+
+    def _portfolios_journal(self):
+        return self.db.journal(
+            self.settings.portfolios_file,
+            "user_id",
+            self.settings.journal_compact_threshold,
+        )
+
+    def get_user(self, username: str) -> Optional[dict]:
+        return self.users.get_by_username(username)
+
+    def create_user(self, username: str, make_record: Callable[[int], dict]) -> dict:
+        return self.users.create(username, make_record)
+
+    def iter_users(self) -> Iterator[dict]:
+        return self.db.iter_records(self.settings.users_file)
+
+    def _portfolio_shards(self) -> ShardedCollection:
+        shards = self.db.sharded(
+            self.settings.portfolios_dir, self.settings.portfolio_shards
+        )
+        if not shards.exists():
+            self._split_into_shards(shards)
+        return shards
+
+    def _split_into_shards(self, shards: ShardedCollection):
+        """Однократно раскладывает portfolios.json (+ журнал) по шардам."""
+        with file_lock(shards.directory + ".lock"):
+            if shards.exists():
+                return
+
+            buckets: Dict[str, dict] = {}
+            for record in self._single_layout_portfolios():
+                path = shards.shard_path(record["user_id"])
+                buckets.setdefault(os.path.basename(path), {})[str(record["user_id"])] = record
+
+            tmp_dir = shards.directory + ".tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            for name, shard in buckets.items():
+                self.db.write_json(os.path.join(tmp_dir, name), shard)
+            os.replace(tmp_dir, shards.directory)
+
+    def _single_layout_portfolios(self) -> Iterator[dict]:
+        if self.settings.journal_enabled:
+            return self._portfolios_journal().all()
+        return self.db.iter_records(self.settings.portfolios_file)
+
+    @property
+    def _sharded(self) -> bool:
+        return self.settings.portfolio_layout == "sharded"
+
+    def get_portfolio(self, user_id: int) -> Optional[dict]:
+        if self._sharded:
+            return self._portfolio_shards().get(user_id)
+
+        if self.settings.journal_enabled:
+            return self._portfolios_journal().get(user_id)
+
+        return self.db.find_record(self.settings.portfolios_file, "user_id", user_id)
+
+    def save_portfolio(self, record: dict) -> dict:
+        if self._sharded:
+            return self._portfolio_shards().put(record["user_id"], record)
+
+        if self.settings.journal_enabled:
+            return self._portfolios_journal().put(record)
+
+        with file_lock(self.settings.portfolios_file + ".lock"):
+            portfolios = self.db.read_json(self.settings.portfolios_file, default=[])
+
+            for i, p_data in enumerate(portfolios):
+                if p_data["user_id"] == record["user_id"]:
+                    record = next_version(p_data, record)
+                    portfolios[i] = record
+                    break
+            else:
+                record = next_version(None, record)
+                portfolios.append(record)
+
+            self.db.write_json_array(
+                self.settings.portfolios_file, portfolios, index_keys=("user_id",)
+            )
+        return record
+
+    def iter_portfolios(self) -> Iterator[dict]:
+        if self._sharded:
+            return self._portfolio_shards().all()
+        return self._single_layout_portfolios()
+
+    def read_rates(self) -> dict:
+        return self.db.read_json(self.settings.rates_file, default=empty_rates())
+
+    def write_rates(self, data: dict):
+        self.db.write_json(self.settings.rates_file, data)
+
+    def _checks_file(self) -> str:
+        return self.settings.rates_file + ".checked"
+
+    def read_rate_checks(self) -> Dict[str, str]:
+        return self.db.read_json(self._checks_file(), default={})
+
+    def rates_version(self) -> Hashable:
+        return (
+            file_signature(self.settings.rates_file),
+            file_signature(self._checks_file()),
+        )
+
+    def mark_rates_checked(self, pairs: Iterable[str], checked_at: str):
+        # Отметки лежат рядом с rates.json, чтобы сам срез (и кеши по его
+        # mtime) не менялся, когда источник ответил «без изменений».
+        checks = self.read_rate_checks()
+        checks.update(dict.fromkeys(pairs, checked_at))
+        self.db.write_json(self._checks_file(), checks)
+
+
+class SqliteStorage(StorageBackend):
+    """Хранилище в SQLite (режим WAL) с индексированными таблицами."""
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            hashed_password TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            registration_date TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS portfolios (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS wallets (
+            user_id INTEGER NOT NULL,
+            currency_code TEXT NOT NULL,
+            balance REAL NOT NULL,
+            units INTEGER,
+            PRIMARY KEY (user_id, currency_code)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rates (
+            pair TEXT PRIMARY KEY,
+            rate REAL NOT NULL,
+            updated_at TEXT,
+            source TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rate_checks (
+            pair TEXT PRIMARY KEY,
+            checked_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or SettingsLoader().sqlite_file
+        self._local = threading.local()
+        # Сигнатура файлов базы может не измениться между двумя быстрыми
+        # коммитами (точность mtime), поэтому свои записи курсов считаются.
+        self._rates_writes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Соединение текущего потока (создаётся лениво)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._upgrade_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection):
+        """Добавляет столбцы, появившиеся после создания базы."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(portfolios)")}
+        if "version" not in columns:
+            conn.execute(
+                "ALTER TABLE portfolios ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        # units NULL — старая строка: баланс только во float-столбце balance.
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(wallets)")}
+        if "units" not in columns:
+            conn.execute("ALTER TABLE wallets ADD COLUMN units INTEGER")
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def get_user(self, username: str) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT * FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def create_user(self, username: str, make_record: Callable[[int], dict]) -> dict:
+        with self._transaction() as conn:
+            if conn.execute(
+                "SELECT 1 FROM users WHERE username = ?", (username,)
+            ).fetchone():
+                raise ValueError(f"Имя пользователя '{username}' уже занято")
+
+            (max_id,) = conn.execute(
+                "SELECT COALESCE(MAX(user_id), 0) FROM users"
+            ).fetchone()
+            record = make_record(max_id + 1)
+            self._insert_user(conn, record)
+        return record
+
+    def iter_users(self) -> Iterator[dict]:
+        for row in self.conn.execute("SELECT * FROM users ORDER BY user_id"):
+            yield dict(row)
+
+    def get_portfolio(self, user_id: int) -> Optional[dict]:
+        conn = self.conn
+        portfolio = conn.execute(
+            "SELECT version FROM portfolios WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if portfolio is None:
+            return None
+
+        rows = conn.execute(
+            "SELECT currency_code, balance, units FROM wallets WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        return {
+            "user_id": user_id,
+            "wallets": {row["currency_code"]: _wallet_record(row) for row in rows},
+            "version": portfolio["version"],
+        }
+
+    def save_portfolio(self, record: dict) -> dict:
+        with self._transaction() as conn:
+            current = conn.execute(
+                "SELECT version FROM portfolios WHERE user_id = ?", (record["user_id"],)
+            ).fetchone()
+            record = next_version(dict(current) if current else None, record)
+            self._replace_portfolio(conn, record)
+        return record
+
+    def iter_portfolios(self) -> Iterator[dict]:
+        current = None
+        for row in self.conn.execute(
+            "SELECT p.user_id, p.version, w.currency_code, w.balance, w.units "
+            "FROM portfolios p "
+            "LEFT JOIN wallets w ON w.user_id = p.user_id ORDER BY p.user_id"
+        ):
+            if current is None or current["user_id"] != row["user_id"]:
+                if current is not None:
+                    yield current
+                current = {"user_id": row["user_id"], "wallets": {}, "version": row["version"]}
+            if row["currency_code"] is not None:
+                current["wallets"][row["currency_code"]] = _wallet_record(row)
+        if current is not None:
+            yield current
+
+    def read_rates(self) -> dict:
+        conn = self.conn
+        pairs = {
+            row["pair"]: {
+                "rate": row["rate"],
+                "updated_at": row["updated_at"],
+                "source": row["source"],
+            }
+            for row in conn.execute("SELECT * FROM rates")
+        }
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'last_refresh'"
+        ).fetchone()
+        return {"pairs": pairs, "last_refresh": row["value"] if row else None}
+
+    def write_rates(self, data: dict):
+        with self._transaction() as conn:
+            self._replace_rates(conn, data)
+        self._rates_writes += 1
+
+    def read_rate_checks(self) -> Dict[str, str]:
+        return {
+            row["pair"]: row["checked_at"]
+            for row in self.conn.execute("SELECT pair, checked_at FROM rate_checks")
+        }
+
+    def mark_rates_checked(self, pairs: Iterable[str], checked_at: str):
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_checks (pair, checked_at) VALUES (?, ?)",
+                [(pair, checked_at) for pair in pairs],
+            )
+        self._rates_writes += 1
+
+    def rates_version(self) -> Hashable:
+        # Любая запись в базу (в том числе портфелей) меняет файл WAL —
+        # курсы тогда перечитываются, это всего несколько строк. Соединение
+        # открывается заранее: при открытии создаётся сам файл WAL.
+        self.conn
+        return (
+            self._rates_writes,
+            file_signature(self.db_path),
+            file_signature(self.db_path + "-wal"),
+        )
+
+    def import_json(self, source: JsonStorage) -> dict:
+        """Копирует данные из JSON-хранилища (идемпотентно).
+
+        Пользователи заменяются по user_id. Если после замены одно имя
+        оказалось бы у двух user_id, миграция не начинается (ValueError).
+        """
+        counts = {"users": 0, "portfolios": 0, "pairs": 0}
+        users = list(source.iter_users())
+
+        with self._transaction() as conn:
+            self._check_username_collisions(conn, users)
+            for record in users:
+                conn.execute("DELETE FROM users WHERE user_id = ?", (record["user_id"],))
+                self._insert_user(conn, record)
+                counts["users"] += 1
+
+            for record in source.iter_portfolios():
+                self._replace_portfolio(conn, record)
+                counts["portfolios"] += 1
+
+            rates = source.read_rates()
+            self._replace_rates(conn, rates)
+            counts["pairs"] = len(rates.get("pairs", {}))
+        self._rates_writes += 1
+
+        return counts
+
+    @staticmethod
+    def _check_username_collisions(conn: sqlite3.Connection, users: List[dict]):
+        """ValueError, если имя пользователя досталось бы разным user_id."""
+        imported_ids = {record["user_id"] for record in users}
+        owners = {
+            row["username"]: row["user_id"]
+            for row in conn.execute("SELECT user_id, username FROM users")
+            if row["user_id"] not in imported_ids
+        }
+
+        collisions = []
+        for record in users:
+            owner = owners.setdefault(record["username"], record["user_id"])
+            if owner != record["user_id"]:
+                collisions.append(f"'{record['username']}' (id {owner} и {record['user_id']})")
+
+        if collisions:
+            raise ValueError(
+                "Имена пользователей заняты другими user_id: " + ", ".join(collisions)
+            )
+
+    @staticmethod
+    def _insert_user(conn: sqlite3.Connection, record: dict):
+        conn.execute(
+            "INSERT INTO users (user_id, username, hashed_password, salt, "
+            "registration_date) VALUES (?, ?, ?, ?, ?)",
+            (
+                record["user_id"],
+                record["username"],
+                record["hashed_password"],
+                record["salt"],
+                record["registration_date"],
+            ),
+        )
+
+    @staticmethod
+    def _replace_portfolio(conn: sqlite3.Connection, record: dict):
+        user_id = record["user_id"]
+        conn.execute(
+            "INSERT OR REPLACE INTO portfolios (user_id, version) VALUES (?, ?)",
+            (user_id, record.get("version", 0)),
+        )
+        conn.execute("DELETE FROM wallets WHERE user_id = ?", (user_id,))
+        rows = []
+        for code, w_data in record.get("wallets", {}).items():
+            units = wallet_units(w_data)
+            rows.append((user_id, code, from_minor_units(units, currency_precision(code)), units))
+        conn.executemany(
+            "INSERT INTO wallets (user_id, currency_code, balance, units) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    @staticmethod
+    def _replace_rates(conn: sqlite3.Connection, data: dict):
+        conn.execute("DELETE FROM rates")
+        conn.executemany(
+            "INSERT INTO rates (pair, rate, updated_at, source) VALUES (?, ?, ?, ?)",
+            [
+                (pair, info["rate"], info.get("updated_at"), info.get("source"))
+                for pair, info in data.get("pairs", {}).items()
+            ],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)",
+            (data.get("last_refresh"),),
+        )
+
+
+def _wallet_record(row: sqlite3.Row) -> dict:
+    """Запись кошелька из строки wallets (float balance — только для старых строк)."""
+    if row["units"] is None:
+        return {"currency_code": row["currency_code"], "balance": row["balance"]}
+    return {"currency_code": row["currency_code"], "units": row["units"]}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT/ROLLBACK вокруг блока кода."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+BACKENDS = {
+    JsonStorage.name: JsonStorage,
+    SqliteStorage.name: SqliteStorage,
+}
+
+
+def create_storage(name: str) -> StorageBackend:
+    """Создаёт бэкенд хранения по имени из настроек."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный бэкенд хранения '{name}'. Доступны: {', '.join(BACKENDS)}"
+        ) from None
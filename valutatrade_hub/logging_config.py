@@ -1,30 +1,229 @@
 """Настройка логирования для проекта."""
 
+import atexit
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 
+from valutatrade_hub.infra.settings import SettingsLoader
 
-def setup_logging(log_file: str = "logs/actions.log", level=logging.INFO):
-    """Настраивает логирование с ротацией файлов."""
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+LOG_FORMATS = ("text", "json")
 
-    logger = logging.getLogger("valutatrade_hub")
-    logger.setLevel(level)
+_listener: Optional["BatchingQueueListener"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись.
+
+    Поля из extra={"fields": {...}} попадают в объект как есть, вместо
+    текстового сообщения; значения, которые JSON не умеет, выводятся через repr.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(fields)
+        else:
+            data["msg"] = record.getMessage()
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=repr)
+
+
+class _BatchFlushMixin:
+    """Обработчик, который сбрасывает поток только по команде слушателя."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchedRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() сразу подставляет аргументы в сообщение; здесь
+    это делает поток слушателя. Поэтому аргументы записей не должны
+    изменяться после вызова logger.* (log_action передаёт кортежи и
+    исходные аргументы операции).
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._dropped = itertools.count(1)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """Кладёт запись в очередь, не дожидаясь места в ней.
+
+        Если ограниченная очередь (LOG_QUEUE_SIZE) полна, запись
+        отбрасывается и учитывается в dropped; слушатель сообщит об этом.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped = next(self._dropped)
+
+
+class BatchingQueueListener(QueueListener):
+    """Фоновый поток записи логов с пакетным сбросом на диск.
+
+    Буферы обработчиков сбрасываются, когда набралось batch_size записей
+    подряд или очередь простояла пустой flush_interval секунд; пока
+    несброшенных записей нет, поток спит на очереди без таймаута. При
+    сбросе он же пишет предупреждение о записях, отброшенных
+    переполненной очередью (source.dropped).
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 256,
+                 flush_interval: float = 0.05,
+                 source: Optional[DeferredQueueHandler] = None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.source = source
+        self._pending = 0
+        self._reported_dropped = 0
 
-    formatter = logging.Formatter(
+    def dequeue(self, block: bool):
+        if self._pending:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush()
+        return self.queue.get()
+
+    def enqueue_sentinel(self):
+        # Ограниченная очередь может быть полна: ждём, пока слушатель её разберёт.
+        self.queue.put(self._sentinel)
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._flush()
+
+    def stop(self):
+        super().stop()
+        self._flush()
+
+    def _flush(self):
+        self._report_dropped()
+        if not self._pending:
+            return
+        for handler in self.handlers:
+            getattr(handler, "flush_batch", handler.flush)()
+        self._pending = 0
+
+
+    def _report_dropped(self):
+        dropped = self.source.dropped if self.source is not None else 0
+        if dropped <= self._reported_dropped:
+            return
+        super().handle(logging.makeLogRecord({
+            "name": "valutatrade_hub",
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "Log queue full: %d records dropped (LOG_QUEUE_SIZE)",
+            "args": (dropped - self._reported_dropped,),
+        }))
+        self._reported_dropped = dropped
+        self._pending += 1
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    return logging.Formatter(
         "%(levelname)s %(asctime)s %(message)s", datefmt="%Y-%m-%dT%H:%M:%S"
     )
 
-    file_handler = RotatingFileHandler(
+
+def setup_logging(log_file: Optional[str] = None, level=None, fmt: Optional[str] = None,
+                  console: bool = True):
+    """Настраивает логирование с ротацией файлов.
+
+    Запись в файл и консоль идёт в фоновом потоке (QueueListener):
+    вызывающий код только кладёт запись в очередь. Параметры по
+    умолчанию берутся из настроек (LOG_FILE, LOG_LEVEL, LOG_FORMAT);
+    console=False отключает вывод в stderr.
+    """
+    global _listener
+
+    settings = SettingsLoader()
+    log_file = log_file or settings.log_file
+    level = level or settings.log_level
+    fmt = fmt or settings.log_format
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Неизвестный формат логов '{fmt}'. Доступны: {', '.join(LOG_FORMATS)}")
+
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+
+    logger = logging.getLogger("valutatrade_hub")
+    logger.setLevel(level)
+
+    shutdown_logging()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    formatter = _formatter(fmt)
+
+    file_handler = BatchedRotatingFileHandler(
         log_file, maxBytes=5 * 1024 * 1024, backupCount=5
     )
     file_handler.setFormatter(formatter)
+    handlers = [file_handler]
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    if console:
+        console_handler = BatchedStreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue: queue.Queue = queue.Queue(settings.log_queue_size)
+    queue_handler = DeferredQueueHandler(log_queue)
+    _listener = BatchingQueueListener(
+        log_queue, *handlers,
+        batch_size=settings.log_batch_size,
+        flush_interval=settings.log_flush_interval,
+        source=queue_handler,
+    )
+    _listener.start()
+    logger.addHandler(queue_handler)
 
     return logger
+
+
+def shutdown_logging():
+    """Дописывает оставшиеся в очереди записи и останавливает поток логов."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,308 @@
+"""Метрики доменных операций: гистограммы задержек и счётчики ошибок."""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from valutatrade_hub.infra.settings import SettingsLoader
+
+# Лог-линейные корзины в стиле HDR: 2**SUB_BUCKET_BITS корзин на каждую
+# степень двойки, то есть относительная погрешность не больше 1/16.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_TRACKED_NS = 1 << 40  # ~18 минут; всё, что дольше, попадает в последнюю корзину
+BUCKET_COUNT = (MAX_TRACKED_NS.bit_length() - SUB_BUCKET_BITS) * SUB_BUCKETS + SUB_BUCKETS
+
+# Границы корзин Prometheus (секунды).
+EXPORT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def bucket_index(value_ns: int) -> int:
+    """Номер корзины для значения в наносекундах."""
+    bits = value_ns.bit_length()
+    if bits <= SUB_BUCKET_BITS + 1:
+        return value_ns
+    shift = bits - SUB_BUCKET_BITS - 1
+    return min((shift << SUB_BUCKET_BITS) + (value_ns >> shift), BUCKET_COUNT - 1)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Границы корзины [lower, upper) в наносекундах."""
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    lower = (index - shift * SUB_BUCKETS) << shift
+    return lower, lower + (1 << shift)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированным набором корзин."""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns: int):
+        self.counts[bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def merge(self, other: "LatencyHistogram"):
+        """Добавляет к гистограмме значения other."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.max_ns > self.max_ns:
+            self.max_ns = other.max_ns
+
+    def percentile(self, p: float) -> int:
+        """Верхняя граница корзины, в которую попадает p-й перцентиль, нс."""
+        if not self.count:
+            return 0
+        rank = max(int(p / 100 * self.count + 0.5), 1)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max_ns)
+        return self.max_ns
+
+    def cumulative(self, bounds_ns: List[int]) -> List[int]:
+        """Накопленные количества для границ bounds_ns (по возрастанию)."""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds_ns:
+            while index < BUCKET_COUNT and bucket_bounds(index)[1] <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class _Shard:
+    """Метрики одного потока: пишет только он, читают snapshot и экспорт."""
+
+    __slots__ = ("histograms", "errors", "thread")
+
+    def __init__(self, thread: Optional[threading.Thread] = None):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.thread = thread
+
+    def merge(self, other: "_Shard"):
+        for action, h in list(other.histograms.items()):
+            merged = self.histograms.get(action)
+            if merged is None:
+                merged = self.histograms[action] = LatencyHistogram()
+            merged.merge(h)
+        for key, n in list(other.errors.items()):
+            self.errors[key] = self.errors.get(key, 0) + n
+
+
+class MetricsRegistry:
+    """Singleton: гистограммы и счётчики по типам операций.
+
+    Каждый поток пишет в собственные гистограммы (threading.local), поэтому
+    запись идёт без блокировки; snapshot и экспорт сводят их под блокировкой.
+    Гистограммы завершившихся потоков сливаются в общие при появлении
+    нового потока. При METRICS_ENABLED=0 log_action время не измеряет, если
+    только его не требует журнал (уровень INFO).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.enabled = SettingsLoader().metrics_enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+        self._initialized = True
+
+    def reset(self):
+        """Обнуляет все метрики (потоки заводят новые гистограммы при следующей записи)."""
+        with self._lock:
+            self._local = threading.local()
+            self._shards: List[_Shard] = []
+            self._retired = _Shard()
+
+    def _thread_shard(self, local: threading.local) -> _Shard:
+        """Заводит гистограммы текущего потока и кладёт их в local."""
+        shard = _Shard(threading.current_thread())
+        with self._lock:
+            alive = []
+            for other in self._shards:
+                if other.thread.is_alive():
+                    alive.append(other)
+                else:
+                    self._retired.merge(other)
+            alive.append(shard)
+            self._shards = alive
+            local.histograms = shard.histograms
+            local.errors = shard.errors
+        return shard
+
+    def _merged(self) -> _Shard:
+        """Сумма гистограмм всех потоков (вызывается под блокировкой)."""
+        total = _Shard()
+        for shard in (self._retired, *self._shards):
+            total.merge(shard)
+        return total
+
+    def record(self, action: str, elapsed_ns: int, error: Optional[BaseException] = None):
+        """Учитывает одно выполнение операции action."""
+        # Горячий путь: индекс корзины считается здесь же, без вызовов функций.
+        bits = elapsed_ns.bit_length()
+        if bits > SUB_BUCKET_BITS + 1:
+            shift = bits - SUB_BUCKET_BITS - 1
+            index = (shift << SUB_BUCKET_BITS) + (elapsed_ns >> shift)
+            if index >= BUCKET_COUNT:
+                index = BUCKET_COUNT - 1
+        else:
+            index = elapsed_ns
+
+        local = self._local
+        try:
+            h = local.histograms[action]
+        except AttributeError:
+            h = self._thread_shard(local).histograms[action] = LatencyHistogram()
+        except KeyError:
+            h = local.histograms[action] = LatencyHistogram()
+        h.counts[index] += 1
+        h.count += 1
+        h.total_ns += elapsed_ns
+        if elapsed_ns > h.max_ns:
+            h.max_ns = elapsed_ns
+        if error is not None:
+            key = (action, type(error).__name__)
+            local.errors[key] = local.errors.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Сводка {action: {count, ok, errors, mean_ms, p50_ms, ...}}."""
+        with self._lock:
+            merged = self._merged()
+            result = {}
+            for action, h in sorted(merged.histograms.items()):
+                errors = {
+                    name: n for (a, name), n in sorted(merged.errors.items()) if a == action
+                }
+                result[action] = {
+                    "count": h.count,
+                    "ok": h.count - sum(errors.values()),
+                    "errors": errors,
+                    "mean_ms": h.total_ns / h.count / 1e6 if h.count else 0.0,
+                    "p50_ms": h.percentile(50) / 1e6,
+                    "p90_ms": h.percentile(90) / 1e6,
+                    "p99_ms": h.percentile(99) / 1e6,
+                    "max_ms": h.max_ns / 1e6,
+                }
+            return result
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        bounds_ns = [int(b * 1e9) for b in EXPORT_BUCKETS]
+        lines = [
+            "# HELP valutatrade_action_duration_seconds Duration of domain actions.",
+            "# TYPE valutatrade_action_duration_seconds histogram",
+        ]
+        with self._lock:
+            merged = self._merged()
+            histograms = sorted(merged.histograms.items())
+            errors = sorted(merged.errors.items())
+
+            for action, h in histograms:
+                label = f'action="{action}"'
+                for bound, n in zip(EXPORT_BUCKETS, h.cumulative(bounds_ns)):
+                    lines.append(
+                        f'valutatrade_action_duration_seconds_bucket{{{label},le="{bound}"}} {n}'
+                    )
+                lines.append(
+                    f'valutatrade_action_duration_seconds_bucket{{{label},le="+Inf"}} {h.count}'
+                )
+                lines.append(f"valutatrade_action_duration_seconds_sum{{{label}}} "
+                             f"{h.total_ns / 1e9:.9f}")
+                lines.append(f"valutatrade_action_duration_seconds_count{{{label}}} {h.count}")
+
+            failed: Dict[str, int] = {}
+            for (action, _), n in errors:
+                failed[action] = failed.get(action, 0) + n
+
+            lines += [
+                "# HELP valutatrade_action_success_total Successful domain actions.",
+                "# TYPE valutatrade_action_success_total counter",
+            ]
+            for action, h in histograms:
+                lines.append(
+                    f'valutatrade_action_success_total{{action="{action}"}} '
+                    f"{h.count - failed.get(action, 0)}"
+                )
+
+            lines += [
+                "# HELP valutatrade_action_errors_total Failed domain actions by exception type.",
+                "# TYPE valutatrade_action_errors_total counter",
+            ]
+            for (action, error), n in errors:
+                lines.append(
+                    f'valutatrade_action_errors_total{{action="{action}",error="{error}"}} {n}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Атомарно записывает метрики в файл (для textfile-коллектора)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+class PrometheusFileExporter:
+    """Фоновый поток, периодически сбрасывающий метрики в файл."""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает поток и записывает итоговое состояние."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        MetricsRegistry().write_prometheus(self.path)
+
+    def _run(self):
+        registry = MetricsRegistry()
+        while not self._stop.wait(self.interval):
+            try:
+                registry.write_prometheus(self.path)
+            except OSError:
+                pass
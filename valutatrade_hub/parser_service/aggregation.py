@@ -0,0 +1,107 @@
+"""Сведение курсов одной пары от нескольких провайдеров."""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+AGGREGATION_METHODS = ("median", "weighted")
+
+
+@dataclass
+class ProviderQuote:
+    """Курс пары от одного провайдера."""
+
+    provider: str
+    rate: float
+    weight: float = 1.0
+    tier: int = 0
+
+
+@dataclass
+class Consensus:
+    """Итоговый курс пары и провайдеры, которые в него вошли или были отброшены."""
+
+    rate: float
+    providers: List[str]
+    dropped: List[str]
+
+    @property
+    def source(self) -> str:
+        return "+".join(dict.fromkeys(self.providers))
+
+
+def weighted_median(values: List[Tuple[float, float]]) -> float:
+    """Взвешенная медиана пар (value, weight).
+
+    При равных весах совпадает с обычной медианой: если накопленный вес
+    ровно делит выборку пополам, берётся среднее двух соседних значений.
+    """
+    ordered = sorted(values)
+    half = sum(weight for _, weight in ordered) / 2
+    cumulative = 0.0
+    for i, (value, weight) in enumerate(ordered):
+        cumulative += weight
+        if cumulative > half:
+            return value
+        if cumulative == half:
+            return (value + ordered[i + 1][0]) / 2
+    return ordered[-1][0]
+
+
+def _preferred(quote: ProviderQuote) -> tuple:
+    return quote.tier, -quote.weight
+
+
+def drop_outliers(quotes: List[ProviderQuote],
+                  threshold: float) -> Tuple[List[ProviderQuote], List[ProviderQuote]]:
+    """Делит курсы на принятые и выбросы (отклонение от медианы больше threshold).
+
+    Из двух расходящихся курсов медиана не выберет верный, поэтому остаётся
+    курс более приоритетного провайдера (ниже tier, больше weight).
+    Если медиана пришлась между курсами и за порогом оказались все, явных
+    выбросов нет — остаются все курсы.
+    """
+    if len(quotes) < 2:
+        return list(quotes), []
+
+    if len(quotes) == 2:
+        a, b = sorted(quotes, key=_preferred)
+        if abs(a.rate - b.rate) <= threshold * min(abs(a.rate), abs(b.rate)):
+            return list(quotes), []
+        return [a], [b]
+
+    center = weighted_median([(q.rate, q.weight) for q in quotes])
+    kept = [q for q in quotes if abs(q.rate - center) <= threshold * abs(center)]
+    if not kept:
+        return list(quotes), []
+    dropped = [q for q in quotes if q not in kept]
+    return kept, dropped
+
+
+def aggregate(quotes: List[ProviderQuote], method: str = "median",
+              outlier_threshold: float = 0.02) -> Optional[Consensus]:
+    """Консенсусный курс пары по курсам провайдеров (None, если курсов нет).
+
+    method: "median" — взвешенная медиана, "weighted" — средневзвешенное.
+    Выбросы отбрасываются до усреднения (см. drop_outliers).
+    """
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(
+            f"Неизвестный способ сведения '{method}'. "
+            f"Доступны: {', '.join(AGGREGATION_METHODS)}"
+        )
+
+    quotes = [q for q in quotes if q.rate and q.weight > 0]
+    if not quotes:
+        return None
+
+    kept, dropped = drop_outliers(quotes, outlier_threshold)
+    if method == "median":
+        rate = weighted_median([(q.rate, q.weight) for q in kept])
+    else:
+        rate = sum(q.rate * q.weight for q in kept) / sum(q.weight for q in kept)
+
+    return Consensus(
+        rate,
+        sorted(q.provider for q in kept),
+        sorted(q.provider for q in dropped),
+    )
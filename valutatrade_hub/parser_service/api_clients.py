@@ -1,38 +1,129 @@
 """API клиенты для получения курсов."""
 
+import json
+import os
 from abc import ABC, abstractmethod
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from valutatrade_hub.core.exceptions import ApiRequestError
 from valutatrade_hub.parser_service.config import ParserConfig
 
 
+def create_session(config: ParserConfig) -> requests.Session:
+    """Создаёт HTTP-сессию с пулом keep-alive соединений и сжатием."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=config.HTTP_POOL_MAXSIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Ответ источника: курсы {PAIR_KEY: rate}, признак «не изменилось» и валидаторы."""
+
+    rates: Dict[str, float]
+    not_modified: bool = False
+    validators: Dict[str, object] = field(default_factory=dict)
+
+
 class BaseApiClient(ABC):
-    """Базовый класс для API-клиентов."""
+    """Базовый класс для API-клиентов.
+
+    Клиент владеет постоянной HTTP-сессией и запоминает последний ответ
+    каждого URL вместе с его ETag/Last-Modified: если источник ответил 304,
+    fetch_rates возвращает прошлые курсы без повторного разбора с
+    not_modified=True. Признак и валидаторы приходят в FetchResult, а не
+    хранятся в общих полях клиента; одновременно клиент опрашивается
+    только одним потоком (RatesUpdater не запускает его, пока не завершён
+    прошлый запрос). name попадает в поле source обновлённых им пар;
+    supported_pairs сообщает RatesUpdater, каких пар ждать для кворума.
+    """
 
-    def __init__(self, config: ParserConfig):
+    name = "ParserService"
+
+    def __init__(self, config: ParserConfig, session: Optional[requests.Session] = None):
         self.config = config
+        self.session = session or create_session(config)
+        self._last: Dict[str, FetchResult] = {}
 
     @abstractmethod
-    def fetch_rates(self) -> Dict[str, float]:
-        """Возвращает словарь курсов в формате {PAIR_KEY: rate}."""
+    def fetch_rates(self) -> FetchResult:
+        """Возвращает курсы в формате {PAIR_KEY: rate} (FetchResult.rates)."""
         pass
 
+    def supported_pairs(self) -> Optional[Set[str]]:
+        """Пары, которые клиент может вернуть (None — заранее неизвестно)."""
+        return None
+
+    def _get(self, url: str) -> Optional[requests.Response]:
+        """Условный GET; возвращает None, если данные не изменились (304)."""
+        headers = {}
+        last = self._last.get(url)
+        if last is not None:
+            if last.validators.get("etag"):
+                headers["If-None-Match"] = last.validators["etag"]
+            if last.validators.get("last_modified"):
+                headers["If-Modified-Since"] = last.validators["last_modified"]
+
+        response = self.session.get(
+            url, headers=headers, timeout=self.config.REQUEST_TIMEOUT
+        )
+        if response.status_code == 304 and last is not None:
+            return None
+
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _http_validators(response: requests.Response) -> dict:
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def _remember(self, url: str, rates: Dict[str, float], validators: dict) -> FetchResult:
+        self._last[url] = FetchResult(rates, False, validators)
+        return FetchResult(dict(rates), False, validators)
+
+    def _cached(self, url: str) -> FetchResult:
+        last = self._last[url]
+        return FetchResult(dict(last.rates), True, last.validators)
+
+    def close(self):
+        """Закрывает HTTP-сессию."""
+        self.session.close()
+
 
 class CoinGeckoClient(BaseApiClient):
     """Клиент для CoinGecko API."""
 
-    def fetch_rates(self) -> Dict[str, float]:
+    name = "CoinGecko"
+
+    def supported_pairs(self) -> Set[str]:
+        return {f"{code}_{self.config.BASE_CURRENCY}" for code in self.config.CRYPTO_ID_MAP}
+
+    def fetch_rates(self) -> FetchResult:
         ids = ",".join(self.config.CRYPTO_ID_MAP.values())
         vs_currencies = self.config.BASE_CURRENCY.lower()
 
         url = f"{self.config.COINGECKO_URL}?ids={ids}&vs_currencies={vs_currencies}"
 
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
+            response = self._get(url)
+            if response is None:
+                return self._cached(url)
             data = response.json()
 
             rates = {}
@@ -42,7 +133,7 @@ class CoinGeckoClient(BaseApiClient):
                     if rate is not None:
                         rates[f"{code}_{self.config.BASE_CURRENCY}"] = rate
 
-            return rates
+            return self._remember(url, rates, self._http_validators(response))
 
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"CoinGecko: {str(e)}")
@@ -51,7 +142,12 @@ class CoinGeckoClient(BaseApiClient):
 class ExchangeRateApiClient(BaseApiClient):
     """Клиент для ExchangeRate-API."""
 
-    def fetch_rates(self) -> Dict[str, float]:
+    name = "ExchangeRate-API"
+
+    def supported_pairs(self) -> Set[str]:
+        return {f"{code}_{self.config.BASE_CURRENCY}" for code in self.config.FIAT_CURRENCIES}
+
+    def fetch_rates(self) -> FetchResult:
         if not self.config.EXCHANGERATE_API_KEY:
             raise ApiRequestError("ExchangeRate-API: отсутствует API-ключ")
 
@@ -62,8 +158,9 @@ class ExchangeRateApiClient(BaseApiClient):
                f"")
 
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
+            response = self._get(url)
+            if response is None:
+                return self._cached(url)
             data = response.json()
 
             if data.get("result") != "success":
@@ -78,7 +175,82 @@ class ExchangeRateApiClient(BaseApiClient):
                 if currency in rates_raw and rates_raw[currency]:
                     pairs[f"{currency}_{self.config.BASE_CURRENCY}"] = 1 / rates_raw[currency]
 
-            return pairs
+            return self._remember(url, pairs, self._http_validators(response))
 
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"ExchangeRate-API: {str(e)}")
+
+
+class KrakenClient(BaseApiClient):
+    """Клиент для публичного Ticker API Kraken (второй источник криптокурсов)."""
+
+    name = "Kraken"
+
+    def supported_pairs(self) -> Set[str]:
+        return {f"{code}_{self.config.BASE_CURRENCY}" for code in self.config.KRAKEN_PAIR_MAP}
+
+    @staticmethod
+    def _result_keys(altname: str) -> tuple:
+        """Kraken отвечает на XBTUSD ключом XXBTZUSD, на SOLUSD — SOLUSD."""
+        return altname, f"X{altname[:-3]}Z{altname[-3:]}"
+
+    def fetch_rates(self) -> FetchResult:
+        url = f"{self.config.KRAKEN_URL}?pair={','.join(self.config.KRAKEN_PAIR_MAP.values())}"
+
+        try:
+            response = self._get(url)
+            if response is None:
+                return self._cached(url)
+            data = response.json()
+
+            if data.get("error"):
+                raise ApiRequestError(f"Kraken: {', '.join(data['error'])}")
+
+            result = data.get("result", {})
+            rates = {}
+            for code, altname in self.config.KRAKEN_PAIR_MAP.items():
+                for key in self._result_keys(altname):
+                    if key in result:
+                        rates[f"{code}_{self.config.BASE_CURRENCY}"] = float(result[key]["c"][0])
+                        break
+
+            return self._remember(url, rates, self._http_validators(response))
+
+        except (requests.exceptions.RequestException, KeyError, IndexError, ValueError) as e:
+            raise ApiRequestError(f"Kraken: {str(e)}")
+
+
+class FileRatesClient(BaseApiClient):
+    """Курсы из локального JSON-файла (LOCAL_RATES_FILE) — резервный провайдер.
+
+    Файл: {"BTC_USD": 59000.0, ...} или срез в формате rates.json
+    ({"pairs": {"BTC_USD": {"rate": ...}}}). Пока mtime файла не меняется,
+    повторно он не читается и результат помечен not_modified.
+    """
+
+    name = "LocalFile"
+
+    def __init__(self, config: ParserConfig, session: Optional[requests.Session] = None):
+        super().__init__(config, session)
+        self.path = config.LOCAL_RATES_FILE
+
+    def fetch_rates(self) -> FetchResult:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            last = self._last.get(self.path)
+            if last is not None and last.validators.get("mtime") == mtime:
+                return self._cached(self.path)
+
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ApiRequestError(f"LocalFile: {str(e)}")
+
+        pairs = data.get("pairs", data) if isinstance(data, dict) else {}
+        rates = {}
+        for pair, value in pairs.items():
+            rate = value.get("rate") if isinstance(value, dict) else value
+            if isinstance(rate, (int, float)) and rate > 0:
+                rates[pair] = float(rate)
+
+        return self._remember(self.path, rates, {"mtime": mtime})
@@ -1,27 +1,51 @@
 """Конфигурация Parser Service."""
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from dotenv import load_dotenv
+from valutatrade_hub.infra.settings import SettingsLoader, load_env
 
-load_dotenv()
+
+def _env(name: str, default: str, cast=str):
+    """Значение по умолчанию из окружения (с .env), читаемое при создании конфига."""
+    def factory():
+        load_env()
+        return cast(os.getenv(name, default))
+    return field(default_factory=factory)
 
 
 @dataclass
 class ParserConfig:
     """Настройки парсера курсов."""
 
-    EXCHANGERATE_API_KEY: str = os.getenv("EXCHANGERATE_API_KEY", "")
+    EXCHANGERATE_API_KEY: str = _env("EXCHANGERATE_API_KEY", "")
+
+    COINGECKO_URL: str = _env(
+        "COINGECKO_URL", "https://api.coingecko.com/api/v3/simple/price"
+    )
+    EXCHANGERATE_API_URL: str = _env(
+        "EXCHANGERATE_API_URL", "https://v6.exchangerate-api.com/v6"
+    )
+    KRAKEN_URL: str = _env("KRAKEN_URL", "https://api.kraken.com/0/public/Ticker")
 
-    COINGECKO_URL: str = "https://api.coingecko.com/api/v3/simple/price"
-    EXCHANGERATE_API_URL: str = "https://v6.exchangerate-api.com/v6"
+    # JSON с курсами {"BTC_USD": 59000.0, ...} (или в формате rates.json);
+    # пустая строка отключает локальный провайдер.
+    LOCAL_RATES_FILE: str = _env("LOCAL_RATES_FILE", "")
 
     BASE_CURRENCY: str = "USD"
     FIAT_CURRENCIES: tuple = ("EUR", "GBP", "RUB")
     CRYPTO_CURRENCIES: tuple = ("BTC", "ETH", "SOL")
 
     CRYPTO_ID_MAP: dict = None
+    KRAKEN_PAIR_MAP: dict = None
+    PROVIDER_INTERVALS: dict = None
+
+    # Провайдеры по имени класса клиента: ярус (0 — основной, следующие
+    # опрашиваются, только если каких-то пар не хватило), вес в консенсусе
+    # и бюджет задержки в секундах.
+    PROVIDER_TIERS: dict = None
+    PROVIDER_WEIGHTS: dict = None
+    PROVIDER_BUDGETS: dict = None
 
     def __post_init__(self):
         self.CRYPTO_ID_MAP = {
@@ -29,8 +53,44 @@ class ParserConfig:
             "ETH": "ethereum",
             "SOL": "solana",
         }
+        self.KRAKEN_PAIR_MAP = {
+            "BTC": "XBTUSD",
+            "ETH": "ETHUSD",
+            "SOL": "SOLUSD",
+        }
+        if self.PROVIDER_INTERVALS is None:
+            self.PROVIDER_INTERVALS = {}
+        if self.PROVIDER_TIERS is None:
+            self.PROVIDER_TIERS = {"FileRatesClient": 1}
+        if self.PROVIDER_WEIGHTS is None:
+            self.PROVIDER_WEIGHTS = {}
+        if self.PROVIDER_BUDGETS is None:
+            self.PROVIDER_BUDGETS = {}
 
-    RATES_FILE_PATH: str = "data/rates.json"
-    HISTORY_FILE_PATH: str = "data/exchange_rates.json"
+    HISTORY_DIR: str = field(default_factory=lambda: SettingsLoader().history_dir)
+    CANDLES_DIR: str = field(
+        default_factory=lambda: os.path.join(SettingsLoader().history_dir, "candles")
+    )
+
+    # Относительное изменение курса, ниже которого пара считается неизменной
+    # и rates.json не переписывается.
+    RATES_CHANGE_EPSILON: float = _env("RATES_CHANGE_EPSILON", "1e-9", float)
+
+    # Сведение курсов пары от нескольких провайдеров: "median" или "weighted",
+    # сколько ответов достаточно, чтобы не ждать остальных, и относительное
+    # отклонение от медианы, после которого курс считается выбросом.
+    RATES_AGGREGATION: str = _env("RATES_AGGREGATION", "median")
+    RATES_QUORUM: int = _env("RATES_QUORUM", "2", int)
+    RATES_OUTLIER_THRESHOLD: float = _env("RATES_OUTLIER_THRESHOLD", "0.02", float)
+    PROVIDER_LATENCY_BUDGET: float = _env("PROVIDER_LATENCY_BUDGET", "5", float)
 
     REQUEST_TIMEOUT: int = 10
+    UPDATE_DEADLINE: float = 15.0
+
+    REFRESH_AHEAD_RATIO: float = 0.5
+    SCHEDULER_JITTER: float = 0.1
+    BACKOFF_BASE: float = 5.0
+    BACKOFF_MAX: float = 120.0
+
+    HTTP_POOL_CONNECTIONS: int = 4
+    HTTP_POOL_MAXSIZE: int = 8
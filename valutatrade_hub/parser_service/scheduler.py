@@ -0,0 +1,176 @@
+"""Фоновое обновление курсов с опережением TTL."""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.parser_service.api_clients import BaseApiClient
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+logger = logging.getLogger("valutatrade_hub")
+
+
+@dataclass
+class ProviderJob:
+    """Состояние расписания одного провайдера."""
+
+    client: BaseApiClient
+    interval: float
+    next_run: float = 0.0
+    failures: int = 0
+    running: bool = False
+    last_success: Optional[str] = None
+    last_error: Optional[str] = None
+    last_status: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.client.__class__.__name__
+
+
+class RatesScheduler:
+    """Планировщик обновления курсов по провайдерам.
+
+    Каждый провайдер опрашивается со своим интервалом (PROVIDER_INTERVALS,
+    по умолчанию — доля TTL, чтобы курсы обновлялись до истечения срока),
+    с разбросом ±jitter и экспоненциальной задержкой после ошибок.
+    Провайдеры, у которых подошёл срок, опрашиваются одним вызовом
+    run_update — с ярусами, кворумом и сведением, где остальные участвуют
+    своими последними ответами: резервный провайдер не перезаписывает
+    курсы основных. Обновление идёт в рабочих потоках и атомарно подменяет
+    срез курсов, поэтому читатели никогда не ждут его завершения.
+    """
+
+    def __init__(self, updater: RatesUpdater, ttl_seconds: int):
+        config = updater.config
+        self.updater = updater
+        self.ttl_seconds = ttl_seconds
+        self.jitter = config.SCHEDULER_JITTER
+        self.backoff_base = config.BACKOFF_BASE
+        self.backoff_max = min(config.BACKOFF_MAX, ttl_seconds * config.REFRESH_AHEAD_RATIO)
+
+        default_interval = ttl_seconds * config.REFRESH_AHEAD_RATIO
+        self.jobs: List[ProviderJob] = [
+            ProviderJob(
+                client,
+                config.PROVIDER_INTERVALS.get(client.__class__.__name__, default_interval),
+            )
+            for client in updater.clients
+        ]
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запускает планировщик в фоновом потоке."""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run_forever, name="rates-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает планировщик."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_forever(self):
+        """Основной цикл: запускает провайдеров, у которых подошёл срок."""
+        logger.info(
+            "Rates scheduler started: "
+            + ", ".join(f"{job.name} every {job.interval:.0f}s" for job in self.jobs)
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.jobs), 1), thread_name_prefix="rates-job"
+        )
+        now = time.monotonic()
+        for job in self.jobs:
+            job.next_run = now
+
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                due = [job for job in self.jobs if not job.running and job.next_run <= now]
+                if due:
+                    for job in due:
+                        job.running = True
+                    self._executor.submit(self._run_jobs, due)
+
+                waiting = [job.next_run for job in self.jobs if not job.running]
+                delay = min(waiting, default=now + 1.0) - now
+                self._stop.wait(min(max(delay, 0.05), 1.0))
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("Rates scheduler stopped")
+
+    def status(self) -> List[dict]:
+        """Состояние провайдеров: интервал, ошибки подряд, время до запуска, статус опроса."""
+        now = time.monotonic()
+        return [
+            {
+                "provider": job.name,
+                "interval": job.interval,
+                "failures": job.failures,
+                "running": job.running,
+                "next_run_in": max(job.next_run - now, 0.0),
+                "last_success": job.last_success,
+                "last_error": job.last_error,
+                "last_status": job.last_status,
+            }
+            for job in self.jobs
+        ]
+
+    def is_healthy(self) -> bool:
+        """True, если планировщик работает и ни один провайдер не в ошибке."""
+        return self.is_running and all(job.failures == 0 for job in self.jobs)
+
+    def _run_jobs(self, jobs: List[ProviderJob]):
+        """Одно сводное обновление по провайдерам jobs; у каждого — свой итог и срок."""
+        try:
+            result = self.updater.run_update([job.client for job in jobs])
+        except ApiRequestError as e:
+            result = {"providers": {}, "errors": [f"{job.name}: {e}" for job in jobs]}
+        except Exception as e:  # планировщик не должен умирать из-за одного обновления
+            logger.exception("Unexpected rates refresh error")
+            result = {"providers": {}, "errors": [f"{job.name}: {e}" for job in jobs]}
+
+        errors = dict(error.split(": ", 1) for error in result["errors"])
+        for job in jobs:
+            job.last_status = result["providers"].get(job.name, "error")
+            if job.name in errors:
+                delay = self._failed(job, errors[job.name])
+            else:
+                job.failures = 0
+                job.last_error = None
+                if job.last_status in ("ok", "not_modified"):
+                    job.last_success = datetime.utcnow().isoformat() + "Z"
+                delay = job.interval
+
+            job.next_run = time.monotonic() + delay * random.uniform(
+                1 - self.jitter, 1 + self.jitter
+            )
+            job.running = False
+
+    def _failed(self, job: ProviderJob, error: str) -> float:
+        """Учитывает ошибку провайдера; возвращает задержку до повтора."""
+        job.failures += 1
+        job.last_error = error
+        delay = min(self.backoff_base * 2 ** (job.failures - 1), self.backoff_max)
+        logger.error(f"{job.name}: refresh failed ({job.failures} in a row), "
+                     f"retry in {delay:.0f}s")
+        return delay
@@ -1 +1,284 @@
-"""Заглушка под будущую реализацию хранилища."""
+"""Бинарное append-only хранилище истории курсов."""
+
+import json
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from valutatrade_hub.infra.database import file_lock
+
+ITEM_SIZE = array("d").itemsize
+
+
+class RateHistoryStore:
+    """История курсов в виде столбцов фиксированной ширины.
+
+    Для каждой пары хранятся два файла: `<PAIR>.ts` (epoch-секунды UTC)
+    и `<PAIR>.rate` (курс), оба — массивы double в порядке добавления.
+    Метки времени возрастают, поэтому выборка по диапазону — это бинарный
+    поиск по mmap-отображению `.ts` и чтение одного среза `.rate`.
+    Небольшой `index.json` хранит число записей и границы по каждой паре.
+    Запись защищена блокировкой потоков и файловой блокировкой
+    `history.lock` (обновлять историю может и демон, и CLI).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = os.path.join(root, "history.lock")
+        self._lock = threading.Lock()
+
+    def _paths(self, pair: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, pair)
+        return base + ".ts", base + ".rate"
+
+    def load_index(self) -> Dict[str, dict]:
+        """Возвращает индекс {pair: {"count", "first", "last"}}."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_index(self, index: Dict[str, dict]):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def append_many(self, rates: Dict[str, float], timestamp: float) -> int:
+        """Дописывает по одной точке для каждой пары; возвращает число записей.
+
+        Точки с меткой времени не позже последней записанной пропускаются,
+        чтобы столбец `.ts` оставался отсортированным.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        written = 0
+
+        with self._lock, file_lock(self.lock_path):
+            index = self.load_index()
+            for pair, rate in rates.items():
+                meta = index.get(pair)
+                if meta and timestamp <= meta["last"]:
+                    continue
+
+                ts_path, rate_path = self._paths(pair)
+                count = self._repair(ts_path, rate_path)
+
+                with open(ts_path, "ab") as f:
+                    array("d", [timestamp]).tofile(f)
+                with open(rate_path, "ab") as f:
+                    array("d", [float(rate)]).tofile(f)
+
+                index[pair] = {
+                    "count": count + 1,
+                    "first": meta["first"] if meta and count else timestamp,
+                    "last": timestamp,
+                }
+                written += 1
+
+            if written:
+                self._save_index(index)
+
+        return written
+
+    def append(self, pair: str, timestamp: float, rate: float) -> bool:
+        """Дописывает одну точку истории."""
+        return self.append_many({pair: rate}, timestamp) == 1
+
+    def range(self, pair: str, start: float, end: float) -> List[Tuple[float, float]]:
+        """Точки пары с start <= ts <= end за O(log n) + размер ответа."""
+        ts_path, rate_path = self._paths(pair)
+        timestamps = self._ts_range(ts_path, start, end)
+        if timestamps is None:
+            return []
+
+        lo, ts_slice = timestamps
+        rates = array("d")
+        with open(rate_path, "rb") as f:
+            f.seek(lo * ITEM_SIZE)
+            rates.frombytes(f.read(len(ts_slice) * ITEM_SIZE))
+
+        return list(zip(ts_slice, rates))
+
+    def last(self, pair: str) -> Optional[Tuple[float, float]]:
+        """Последняя точка пары или None."""
+        meta = self.load_index().get(pair)
+        if not meta:
+            return None
+        points = self.range(pair, meta["last"], meta["last"])
+        return points[-1] if points else None
+
+    @staticmethod
+    def _ts_range(ts_path: str, start: float, end: float):
+        try:
+            f = open(ts_path, "rb")
+        except FileNotFoundError:
+            return None
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < ITEM_SIZE:
+                return None
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)[: size - size % ITEM_SIZE].cast("d")
+                try:
+                    lo = bisect_left(view, start)
+                    hi = bisect_right(view, end, lo)
+                    ts_slice = array("d", view[lo:hi])
+                finally:
+                    view.release()
+
+        return lo, ts_slice
+
+    @staticmethod
+    def _repair(ts_path: str, rate_path: str) -> int:
+        """Выравнивает длины столбцов после прерванной записи; возвращает count."""
+        sizes = []
+        for path in (ts_path, rate_path):
+            try:
+                sizes.append(os.path.getsize(path))
+            except FileNotFoundError:
+                sizes.append(0)
+
+        count = min(sizes) // ITEM_SIZE
+        for path, size in zip((ts_path, rate_path), sizes):
+            if size != count * ITEM_SIZE:
+                with open(path, "r+b") as f:
+                    f.truncate(count * ITEM_SIZE)
+        return count
+
+
+ROLLUPS = {"1m": 60, "1h": 3600, "1d": 86400}
+CANDLE_FIELDS = ("start", "open", "high", "low", "close", "count")
+CANDLE_WIDTH = len(CANDLE_FIELDS)
+CANDLE_SIZE = CANDLE_WIDTH * ITEM_SIZE
+
+_INTERVAL_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(value: str) -> int:
+    """Переводит интервал вида '15m', '4h', '1d' в секунды."""
+    value = value.strip().lower()
+    unit = _INTERVAL_UNITS.get(value[-1:])
+    if unit is None or not value[:-1].isdigit() or int(value[:-1]) <= 0:
+        raise ValueError(f"Некорректный интервал '{value}' (примеры: 1m, 15m, 1h, 1d)")
+    return int(value[:-1]) * unit
+
+
+class CandleStore:
+    """Свечи OHLC по парам с агрегатами 1m/1h/1d.
+
+    Для каждой пары и агрегата — файл `<PAIR>.<rollup>.bin` из записей
+    фиксированной ширины (start, open, high, low, close, count). Новая
+    точка обновляет последнюю свечу на месте или дописывает новую;
+    обновление идёт под файловой блокировкой `candles.lock`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock_path = os.path.join(root, "candles.lock")
+
+    def _path(self, pair: str, rollup: str) -> str:
+        return os.path.join(self.root, f"{pair}.{rollup}.bin")
+
+    def update_many(self, rates: Dict[str, float], timestamp: float):
+        """Учитывает новую точку каждой пары во всех агрегатах."""
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            for pair, rate in rates.items():
+                for rollup, seconds in ROLLUPS.items():
+                    self._update(self._path(pair, rollup), seconds, timestamp, float(rate))
+
+    @staticmethod
+    def _update(path: str, seconds: int, timestamp: float, rate: float):
+        bucket = float(int(timestamp // seconds) * seconds)
+
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            size -= size % CANDLE_SIZE
+
+            last = array("d")
+            if size:
+                f.seek(size - CANDLE_SIZE)
+                last.frombytes(f.read(CANDLE_SIZE))
+
+            if last and last[0] == bucket:
+                last[2] = max(last[2], rate)
+                last[3] = min(last[3], rate)
+                last[4] = rate
+                last[5] += 1
+                f.seek(size - CANDLE_SIZE)
+                last.tofile(f)
+            elif not last or bucket > last[0]:
+                f.seek(size)
+                array("d", [bucket, rate, rate, rate, rate, 1.0]).tofile(f)
+
+    def query(self, pair: str, interval: int, start: float, end: float) -> List[dict]:
+        """Свечи интервала `interval` секунд, пересекающиеся с [start, end].
+
+        Читается самый крупный агрегат, на который делится интервал;
+        его свечи сливаются в свечи запрошенного размера.
+        """
+        rollup = max(
+            (name for name, seconds in ROLLUPS.items() if interval % seconds == 0),
+            key=ROLLUPS.get,
+            default=None,
+        )
+        if rollup is None:
+            raise ValueError("Интервал должен быть кратен одной минуте")
+
+        first_bucket = int(start // interval) * interval
+        rows = self._read_range(self._path(pair, rollup), first_bucket, end)
+
+        candles: List[dict] = []
+        for row in rows:
+            bucket = int(row[0] // interval) * interval
+            if candles and candles[-1]["start"] == bucket:
+                candle = candles[-1]
+                candle["high"] = max(candle["high"], row[2])
+                candle["low"] = min(candle["low"], row[3])
+                candle["close"] = row[4]
+                candle["count"] += int(row[5])
+            else:
+                candles.append({
+                    "start": bucket,
+                    "open": row[1],
+                    "high": row[2],
+                    "low": row[3],
+                    "close": row[4],
+                    "count": int(row[5]),
+                })
+        return candles
+
+    @staticmethod
+    def _read_range(path: str, start: float, end: float) -> List[tuple]:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            size -= size % CANDLE_SIZE
+            if not size:
+                return []
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)[:size].cast("d")
+                try:
+                    starts = view[::CANDLE_WIDTH]
+                    lo = bisect_left(starts, start)
+                    hi = bisect_right(starts, end, lo)
+                    starts.release()
+                    flat = array("d", view[lo * CANDLE_WIDTH:hi * CANDLE_WIDTH])
+                finally:
+                    view.release()
+
+        return [
+            tuple(flat[i:i + CANDLE_WIDTH]) for i in range(0, len(flat), CANDLE_WIDTH)
+        ]
@@ -1,16 +1,27 @@
 """Обновление курсов валют."""
 
 import logging
-from datetime import datetime
-from typing import List
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
 from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.rate_snapshot import RateSnapshot, invalidate_rate_snapshot
 from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.parser_service.aggregation import ProviderQuote, aggregate
 from valutatrade_hub.parser_service.api_clients import BaseApiClient
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.storage import CandleStore, RateHistoryStore
 
 logger = logging.getLogger("valutatrade_hub")
 
+ANSWERED = ("ok", "not_modified", "cached")
+ANSWER_LABELS = {"ok": "OK", "not_modified": "not modified", "cached": "cached answer"}
+
 
 class RatesUpdater:
     """Координатор обновления курсов."""
@@ -19,48 +30,333 @@ class RatesUpdater:
         self.clients = clients
         self.config = config
         self.db = DatabaseManager()
+        self.history = RateHistoryStore(config.HISTORY_DIR)
+        self.candles = CandleStore(config.CANDLES_DIR)
+        self._write_lock = threading.Lock()
+        self._inflight: Dict[BaseApiClient, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._answers: Dict[BaseApiClient, tuple] = {}
+
+    def run_update(self, clients: Optional[List[BaseApiClient]] = None) -> dict:
+        """Запускает обновление курсов от всех клиентов (или подмножества clients).
+
+        Свежие курсы вливаются в текущий срез: пары, которые в этот раз никто
+        не вернул (например, провайдер недоступен), сохраняются со своими
+        updated_at и source. Пара, курс которой сдвинулся не больше чем на
+        RATES_CHANGE_EPSILON (относительно), не переписывается, а только
+        отмечается подтверждённой; если так со всеми парами, срез не пишется
+        вовсе. Изменения прогона — в поле delta (см. _merge).
 
-    def run_update(self) -> dict:
-        """Запускает обновление курсов от всех клиентов."""
+        Курсы одной пары от нескольких провайдеров сводятся в один
+        (RATES_AGGREGATION, выбросы — в поле outliers); порядок опроса и
+        отсечение медленных провайдеров описаны в _fetch_all. Клиенты
+        updater, не вошедшие в clients, участвуют в сведении своим последним
+        ответом (статус cached, см. _cached_answers); пара, которую в этот
+        раз подтвердили только такие ответы, не обновляется. Если опрашивать
+        не пришлось никого, срез остаётся как есть.
+        """
         logger.info("Starting rates update...")
 
-        all_rates = {}
-        errors = []
+        clients = self.clients if clients is None else clients
+        fetched, report = self._collect(clients)
 
-        for client in self.clients:
-            client_name = client.__class__.__name__
-            try:
-                logger.info(f"Fetching from {client_name}...")
-                rates = client.fetch_rates()
-                if rates:
-                    all_rates.update(rates)
-                logger.info(f"{client_name}: OK ({len(rates)} rates)")
-            except ApiRequestError as e:
-                errors.append(f"{client_name}: {str(e)}")
-                logger.error(f"Failed to fetch from {client_name}: {str(e)}")
-
-        if not all_rates:
+        if not fetched and report["timings"]:
             raise ApiRequestError("Не удалось получить ни одного курса")
 
+        storage = self.db.storage
         timestamp = datetime.utcnow().isoformat() + "Z"
-        pairs_dict = {}
-        for pair, rate in all_rates.items():
-            pairs_dict[pair] = {
-                "rate": rate,
-                "updated_at": timestamp,
-                "source": "ParserService",
-            }
-
-        rates_data = {
-            "pairs": pairs_dict,
-            "last_refresh": timestamp,
-        }
 
-        self.db.write_json(self.config.RATES_FILE_PATH, rates_data)
-        logger.info(f"Writing {len(all_rates)} rates to {self.config.RATES_FILE_PATH}...")
+        with self._write_lock:
+            current = storage.read_rates()
+            pairs, delta = self._merge(
+                current.get("pairs", {}), fetched, storage.read_rate_checks(), timestamp
+            )
+            moved = delta["added"] + delta["changed"]
+
+            if delta["unchanged"]:
+                storage.mark_rates_checked(delta["unchanged"], timestamp)
+            if moved:
+                storage.write_rates({"pairs": pairs, "last_refresh": timestamp})
+                logger.info(f"Writing {len(moved)} changed rates to {storage.name} storage...")
+            else:
+                logger.info("No rate moved beyond epsilon, skipping write")
+            invalidate_rate_snapshot()
+
+        if moved:
+            self._record_history({pair: fetched[pair][0] for pair in moved}, timestamp)
 
         return {
-            "total_rates": len(all_rates),
-            "last_refresh": timestamp,
-            "errors": errors,
+            "total_rates": len(fetched),
+            "last_refresh": timestamp if moved else current.get("last_refresh"),
+            **report,
+            "not_modified": not moved,
+            "delta": delta,
         }
+
+    def _collect(self, clients: List[BaseApiClient]) -> tuple:
+        """Опрашивает клиентов и сводит курсы: ({pair: (rate, source)}, report).
+
+        report: errors, timings (секунды по опрошенным клиентам), providers
+        (статус каждого клиента) и outliers ({pair: [отброшенные провайдеры]}).
+        """
+        quotes = defaultdict(list)
+        fresh = set()
+        report = {"errors": [], "timings": {}, "providers": {}, "outliers": {}}
+
+        outcomes = self._fetch_all(clients, self._cached_answers(clients))
+
+        for client, (status, payload, elapsed) in outcomes.items():
+            client_name = client.__class__.__name__
+            report["providers"][client_name] = status
+            if status not in ("skipped", "busy", "cached"):
+                report["timings"][client_name] = round(elapsed, 4)
+
+            if status in ANSWERED:
+                weight = self.config.PROVIDER_WEIGHTS.get(client_name, 1.0)
+                tier = self._tier(client)
+                for pair, rate in (payload or {}).items():
+                    quotes[pair].append(ProviderQuote(client.name, rate, weight, tier))
+                if status != "cached":
+                    fresh.add(client.name)
+                    self._answers[client] = (payload, time.monotonic())
+                logger.info(
+                    f"{client_name}: {ANSWER_LABELS[status]} "
+                    f"({len(payload)} rates, {elapsed:.3f}s)"
+                )
+            elif status in ("cancelled", "busy"):
+                logger.info(f"{client_name}: {payload} ({elapsed:.3f}s)")
+            elif status == "error":
+                report["errors"].append(f"{client_name}: {payload}")
+                logger.error(f"Failed to fetch from {client_name}: {payload}")
+
+        return self._consensus(quotes, fresh, report), report
+
+    def _consensus(self, quotes: Dict[str, List[ProviderQuote]], fresh: set,
+                   report: dict) -> Dict[str, tuple]:
+        """Сводит курсы пар; пары, где нет ни одного провайдера из fresh, пропускаются."""
+        fetched = {}
+        for pair, pair_quotes in quotes.items():
+            # Резервный ярус восполняет только пары, которых нет у основных.
+            best_tier = min(quote.tier for quote in pair_quotes)
+            pair_quotes = [quote for quote in pair_quotes if quote.tier == best_tier]
+            consensus = aggregate(
+                pair_quotes, self.config.RATES_AGGREGATION, self.config.RATES_OUTLIER_THRESHOLD
+            )
+            if consensus is None or fresh.isdisjoint(consensus.providers):
+                continue
+            fetched[pair] = (consensus.rate, consensus.source)
+            if consensus.dropped:
+                report["outliers"][pair] = consensus.dropped
+                logger.warning(f"{pair}: outliers dropped from {', '.join(consensus.dropped)}")
+        return fetched
+
+    def _merge(self, current: Dict[str, dict], fetched: Dict[str, tuple],
+               checks: Dict[str, str], timestamp: str) -> tuple:
+        """Вливает fetched в пары среза current; возвращает (pairs, delta).
+
+        delta — списки пар: added (новые), changed (курс сдвинулся больше
+        epsilon), unchanged (подтверждены без изменений), stale (в этот раз
+        не получены и уже старше TTL).
+        """
+        epsilon = self.config.RATES_CHANGE_EPSILON
+        pairs = dict(current)
+        delta = {"added": [], "changed": [], "unchanged": [], "stale": []}
+
+        for pair, (rate, source) in sorted(fetched.items()):
+            old_rate = (current.get(pair) or {}).get("rate")
+            if old_rate and abs(rate - old_rate) <= epsilon * abs(old_rate):
+                delta["unchanged"].append(pair)
+                continue
+            delta["changed" if old_rate else "added"].append(pair)
+            pairs[pair] = {"rate": rate, "updated_at": timestamp, "source": source}
+
+        kept = RateSnapshot(
+            {"pairs": {p: d for p, d in current.items() if p not in fetched}},
+            checks,
+            SettingsLoader().rates_ttl_seconds,
+        )
+        now = time.time()
+        delta["stale"] = sorted(
+            pair for pair, quote in kept.quotes.items() if not quote.is_fresh(now)
+        )
+        return pairs, delta
+
+    def _record_history(self, rates: Dict[str, float], timestamp: str):
+        """Дописывает срез в историю и свечи; ошибки не прерывают обновление."""
+        epoch = datetime.fromisoformat(timestamp.rstrip("Z")).replace(
+            tzinfo=timezone.utc
+        ).timestamp()
+        try:
+            written = self.history.append_many(rates, epoch)
+            if written:
+                self.candles.update_many(rates, epoch)
+            logger.info(f"Appended {written} points to history in {self.config.HISTORY_DIR}")
+        except OSError as e:
+            logger.error(f"Failed to append rates history: {e}")
+
+    def _cached_answers(self, clients: List[BaseApiClient]) -> Dict[BaseApiClient, tuple]:
+        """Последние ответы клиентов updater вне clients, не старше TTL курсов.
+
+        {client: ("cached", rates, возраст ответа в секундах)}.
+        """
+        ttl = SettingsLoader().rates_ttl_seconds
+        now = time.monotonic()
+        cached = {}
+        for client in self.clients:
+            answer = self._answers.get(client)
+            if client in clients or answer is None:
+                continue
+            rates, received = answer
+            if now - received <= ttl:
+                cached[client] = ("cached", rates, now - received)
+        return cached
+
+    def _tier(self, client: BaseApiClient) -> int:
+        return self.config.PROVIDER_TIERS.get(client.__class__.__name__, 0)
+
+    def _budget(self, client: BaseApiClient) -> float:
+        return self.config.PROVIDER_BUDGETS.get(
+            client.__class__.__name__, self.config.PROVIDER_LATENCY_BUDGET
+        )
+
+    def _fetch_one(self, client: BaseApiClient) -> tuple:
+        logger.info(f"Fetching from {client.__class__.__name__}...")
+        t0 = time.perf_counter()
+        try:
+            result = client.fetch_rates()
+            status = "not_modified" if result.not_modified else "ok"
+            return status, result.rates, time.perf_counter() - t0
+        except ApiRequestError as e:
+            return "error", str(e), time.perf_counter() - t0
+
+    def _fetch_all(self, clients: List[BaseApiClient],
+                   cached: Dict[BaseApiClient, tuple]) -> Dict[BaseApiClient, tuple]:
+        """Опрашивает клиентов по ярусам (PROVIDER_TIERS) в пределах общего дедлайна.
+
+        Клиенты одного яруса опрашиваются параллельно (см. _run_tier).
+        Следующий ярус опрашивается, только если каких-то пар после
+        предыдущих ярусов и прошлых ответов cached не хватает; иначе его
+        клиенты получают статус skipped. Возвращает cached, дополненный
+        {client: (status, rates | причина, elapsed_seconds)} опрошенных.
+        """
+        deadline = time.perf_counter() + self.config.UPDATE_DEADLINE
+        outcomes = dict(cached)
+        known = [*outcomes, *clients]
+
+        tiers = defaultdict(list)
+        for client in clients:
+            tiers[self._tier(client)].append(client)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(len(clients), 1), thread_name_prefix="rates-fetch"
+        )
+        try:
+            for tier in sorted(tiers):
+                if outcomes and not self._needs_fallback(known, outcomes):
+                    for client in tiers[tier]:
+                        outcomes[client] = ("skipped", "пары получены от предыдущих ярусов", 0.0)
+                    continue
+                self._run_tier(executor, tiers[tier], outcomes, deadline)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return outcomes
+
+    def _submit(self, executor: ThreadPoolExecutor, client: BaseApiClient) -> Optional[Future]:
+        """Запускает опрос клиента; None, если его прошлый запрос ещё не завершён.
+
+        Отброшенный по бюджету или кворуму запрос продолжает работать в
+        своём потоке; второй параллельный запрос делил бы с ним HTTP-сессию
+        и запомненные ответы клиента, поэтому такой клиент пропускается.
+        """
+        with self._inflight_lock:
+            previous = self._inflight.get(client)
+            if previous is not None and not previous.done():
+                return None
+            future = self._inflight[client] = executor.submit(self._fetch_one, client)
+            return future
+
+    def _run_tier(self, executor: ThreadPoolExecutor, clients: List[BaseApiClient],
+                  outcomes: dict, deadline: float):
+        """Опрашивает ярус, пока не набран кворум или не вышли бюджеты задержки.
+
+        Клиент, не ответивший за свой бюджет (PROVIDER_BUDGETS или
+        PROVIDER_LATENCY_BUDGET), считается ошибкой. Как только каждая пара,
+        заявленная клиентами яруса (supported_pairs), получена от
+        RATES_QUORUM из них, остальных больше не ждут (статус cancelled):
+        начатый HTTP-запрос прервать нельзя, его результат просто
+        отбрасывается, а сам запрос ограничен REQUEST_TIMEOUT. Пока он не
+        завершился, клиент не опрашивается снова (статус busy, см. _submit).
+        """
+        started = time.perf_counter()
+        futures = {}
+        for client in clients:
+            future = self._submit(executor, client)
+            if future is None:
+                outcomes[client] = ("busy", "прошлый запрос к провайдеру ещё не завершён", 0.0)
+            else:
+                futures[future] = client
+        ends = {
+            future: min(started + self._budget(client), deadline)
+            for future, client in futures.items()
+        }
+        pending = set(futures)
+
+        while pending and not self._quorum_met(clients, outcomes):
+            timeout = max(min(ends[future] for future in pending) - time.perf_counter(), 0)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future in list(pending):
+                if future in done:
+                    outcomes[futures[future]] = future.result()
+                elif now >= ends[future]:
+                    outcomes[futures[future]] = (
+                        "error", self._expired(futures[future], ends[future], deadline),
+                        now - started,
+                    )
+                else:
+                    continue
+                pending.discard(future)
+
+        for future in pending:
+            future.cancel()
+            outcomes[futures[future]] = (
+                "cancelled", "кворум набран без него", time.perf_counter() - started
+            )
+
+    def _expired(self, client: BaseApiClient, end: float, deadline: float) -> str:
+        if end >= deadline:
+            return f"превышен общий дедлайн обновления ({self.config.UPDATE_DEADLINE} с)"
+        return f"превышен бюджет задержки ({self._budget(client)} с)"
+
+    def _quorum_met(self, clients: List[BaseApiClient], outcomes: dict) -> bool:
+        """Каждая заявленная пара получена от min(RATES_QUORUM, заявивших её) клиентов.
+
+        Если ни один клиент не заявил свои пары, кворум не наступает и
+        ждут всех.
+        """
+        declared = {client: client.supported_pairs() or set() for client in clients}
+        answered = [
+            outcomes[client][1] for client in clients
+            if client in outcomes and outcomes[client][0] in ANSWERED
+        ]
+        wanted = set().union(*declared.values())
+        if not wanted:
+            return False
+
+        for pair in wanted:
+            providers = sum(1 for pairs in declared.values() if pair in pairs)
+            have = sum(1 for rates in answered if pair in rates)
+            if have < min(self.config.RATES_QUORUM, providers):
+                return False
+        return True
+
+    def _needs_fallback(self, clients: List[BaseApiClient], outcomes: dict) -> bool:
+        """Не получена хотя бы одна заявленная пара (или вообще ни одного курса)."""
+        got = set()
+        for status, payload, _ in outcomes.values():
+            if status in ANSWERED:
+                got.update(payload or {})
+
+        wanted = set().union(*(client.supported_pairs() or set() for client in clients))
+        return not got or bool(wanted - got)